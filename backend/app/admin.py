@@ -3,11 +3,20 @@ from django.contrib import admin
 from .models import *
 
 
+class IngredientRecipeInline(admin.TabularInline):
+    model = IngredientRecipe
+    autocomplete_fields = ('ingredient',)
+    min_num = 1
+    extra = 0
+
+
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'name', 'author',)
+    list_display = ('pk', 'name', 'author', 'favorites_count',)
     list_filter = ('author', 'name', 'tags',)
+    readonly_fields = ('favorites_count', 'carts_count',)
     empty_value_display = '-пусто-'
-    filter_horizontal = ('tags', 'ingredients',)
+    filter_horizontal = ('tags',)
+    inlines = (IngredientRecipeInline,)
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -17,10 +26,19 @@ class IngredientAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'user', 'status', 'attempts', 'created', 'finished',
+    )
+    list_filter = ('name', 'status',)
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Favorite)
 admin.site.register(ShoppingCart)
 admin.site.register(IngredientRecipe)
+admin.site.register(Job, JobAdmin)
 # admin.site.register(TagRecipe)
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.signals import request_started
+        from django.db.models.signals import post_migrate
+        from foodgram.connections import schedule_health_checks
+
+        from . import signals, tasks  # noqa: F401
+        from .search import create_search_table
+
+        post_migrate.connect(create_search_table, sender=self)
+        if settings.DB_CONN_HEALTH_CHECKS:
+            request_started.connect(schedule_health_checks)
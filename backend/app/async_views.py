@@ -0,0 +1,65 @@
+"""Асинхронные вьюхи для ASGI.
+
+ORM Django 3.2 синхронный, поэтому чтение справочников, списка рецептов
+и ленты выполняется в пуле потоков (размер задает ASGI_THREADS), а цикл
+событий тем временем держит медленных клиентов, не занимая поток на
+каждого. Маршруты берутся из роутера app.urls, так что пути, фильтры и
+ответы совпадают с WSGI.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import re_path
+from foodgram.metrics import install_query_counter
+from rest_framework.permissions import SAFE_METHODS
+
+ASYNC_ROUTES = ('tag-list', 'ingredient-list', 'recipe-list', 'recipe-feed')
+
+
+def db_sync_to_async(func):
+    """Вызов синхронного кода с ORM в общем пуле потоков.
+
+    Вместо единственного потока sync_to_async по умолчанию запросы
+    выполняются параллельно; соединения потока проверяются до и после
+    вызова, как это делают сигналы request_started/request_finished,
+    а их SQL-запросы учитываются в метриках запроса.
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        install_query_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def async_read_view(view):
+    """Асинхронная обертка DRF-вьюхи.
+
+    Безопасные запросы идут в пул потоков, записи (POST на список
+    рецептов) — в общий поток, как у синхронных вьюх под ASGI.
+    Атрибуты вьюхи (cls, csrf_exempt) сохраняются.
+    """
+    read = db_sync_to_async(view)
+    write = sync_to_async(view)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        handler = read if request.method in SAFE_METHODS else write
+        return await handler(request, *args, **kwargs)
+    return async_view
+
+
+def async_urlpatterns(router):
+    """Маршруты ASYNC_ROUTES роутера с асинхронными вьюхами."""
+    return [
+        re_path(
+            pattern.pattern.regex.pattern,
+            async_read_view(pattern.callback),
+            name=pattern.name,
+        )
+        for pattern in router.urls
+        if pattern.name in ASYNC_ROUTES
+    ]
@@ -0,0 +1,90 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import router
+from django.db.models import Count, Max
+
+from .cache import INGREDIENTS_VERSION, get_version
+from .models import Ingredient
+
+
+def ingredients():
+    return Ingredient.objects.using(router.db_for_write(Ingredient))
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов для автодополнения.
+
+    Хранит отсортированный массив названий в нижнем регистре: совпадения
+    по префиксу находятся бинарным поиском, затем добирается подстрока.
+    Индекс строится при первом поиске и перестраивается, когда версия
+    ингредиентов в общем кэше меняется (см. app.signals). Кроме того,
+    не чаще раза в INGREDIENT_INDEX_CHECK_SECONDS число строк и
+    наибольший id сверяются с таблицей: добавленные ингредиенты
+    появляются, даже если смена версии до процесса не дошла. Индекс
+    и сверка читают основную БД, а не реплику запроса.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._fingerprint = None
+        self._checked = 0
+        self._keys = []
+        self._ids = []
+
+    def build(self, version):
+        entries = sorted(
+            (name.lower(), pk)
+            for pk, name in ingredients().values_list('pk', 'name')
+        )
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._ids = [pk for _, pk in entries]
+            self._version = version
+            self._fingerprint = {
+                'total': len(entries),
+                'last': max(self._ids, default=None),
+            }
+            self._checked = time.monotonic()
+
+    def ensure_fresh(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version != self._version:
+            self.build(version)
+        elif (
+            time.monotonic() - self._checked
+            >= settings.INGREDIENT_INDEX_CHECK_SECONDS
+        ):
+            fingerprint = ingredients().aggregate(
+                total=Count('pk'), last=Max('pk')
+            )
+            if fingerprint != self._fingerprint:
+                self.build(version)
+            else:
+                self._checked = time.monotonic()
+
+    def search(self, value, limit):
+        """Id ингредиентов: сначала по префиксу, затем по подстроке."""
+        self.ensure_fresh()
+        keys, ids = self._keys, self._ids
+        value = value.lower()
+        found = []
+        position = bisect_left(keys, value)
+        while (
+            position < len(keys) and len(found) < limit
+            and keys[position].startswith(value)
+        ):
+            found.append(ids[position])
+            position += 1
+        for key, pk in zip(keys, ids):
+            if len(found) >= limit:
+                break
+            if value in key and not key.startswith(value):
+                found.append(pk)
+        return found
+
+
+ingredient_index = IngredientIndex()
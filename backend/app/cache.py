@@ -0,0 +1,32 @@
+import time
+
+from django.core.cache import cache
+
+INGREDIENTS_VERSION = 'ingredients'
+SHOPPING_CART_VERSION = 'shopping_cart'
+TAGS_VERSION = 'tags'
+
+
+def get_version(name):
+    """Текущая версия набора данных, общая для всех процессов.
+
+    Версия хранится в общем кэше (см. CACHES). Отсутствующая версия —
+    первый запуск, вытеснение или перезапуск кэша — начинается со
+    времени создания, а не с нуля, чтобы прежние значения и ETag,
+    построенные на них, не повторялись.
+    """
+    key = f'version:{name}'
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(name):
+    """Смена версии: все ключи и индексы старой версии устаревают."""
+    try:
+        cache.incr(f'version:{name}')
+    except ValueError:
+        cache.set(f'version:{name}', time.time_ns(), None)
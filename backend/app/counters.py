@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Subscribe, User
+
+from .models import Favorite, Recipe, ShoppingCart
+
+# Счетчик, его таблица, связь-источник и поле внешнего ключа источника.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscribe, 'following'),
+)
+
+bulk_counted = ContextVar('bulk_counted', default=False)
+
+
+@contextmanager
+def counted_in_bulk():
+    """Удаления внутри блока не меняют счетчики и кэш в сигналах:
+    вызывающий код учитывает их сам через update_counters_bulk."""
+    token = bulk_counted.set(True)
+    try:
+        yield
+    finally:
+        bulk_counted.reset(token)
+
+
+def change_counter(model, pks, field, delta):
+    """Атомарное изменение счетчика выражением F(), без чтения строк."""
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def update_counters(instance, delta):
+    """Учет созданной или удаленной строки во всех зависимых счетчиках."""
+    for model, field, source, foreign_key in COUNTERS:
+        if isinstance(instance, source):
+            change_counter(
+                model, [getattr(instance, f'{foreign_key}_id')], field, delta
+            )
+
+
+def update_counters_bulk(source, pks, delta):
+    """Учет пакетной вставки или удаления строк source, сделанных без
+    сигналов; pks — значения внешнего ключа счетчика (id рецептов)."""
+    for model, field, counted, _ in COUNTERS:
+        if counted is source and pks:
+            change_counter(model, pks, field, delta)
+
+
+def actual_count(source, foreign_key):
+    """Подзапрос с фактическим числом строк источника для OuterRef('pk')."""
+    return Coalesce(Subquery(
+        source.objects.filter(
+            **{foreign_key: OuterRef('pk')}
+        ).order_by().values(foreign_key).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile_counters(dry_run=False):
+    """Сверка счетчиков с таблицами-источниками.
+
+    Возвращает число расходящихся строк для каждого счетчика; без
+    dry_run счетчики пересчитываются одним UPDATE на столбец.
+    """
+    drift = {}
+    for model, field, source, foreign_key in COUNTERS:
+        expression = actual_count(source, foreign_key)
+        drift[f'{model._meta.label}.{field}'] = model.objects.annotate(
+            actual=expression
+        ).exclude(**{field: F('actual')}).count()
+        if not dry_run:
+            model.objects.update(**{field: expression})
+    return drift
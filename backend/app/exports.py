@@ -0,0 +1,139 @@
+import csv
+import os
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from .cache import SHOPPING_CART_VERSION, get_version
+from .models import IngredientRecipe
+
+CHUNK_SIZE = 2000
+PDF_CHUNK_SIZE = 64 * 1024
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 18
+PDF_MARGIN = 50
+
+
+def shopping_cart_cache_key(user_id):
+    version = get_version(SHOPPING_CART_VERSION)
+    return f'shopping_cart:{version}:{user_id}'
+
+
+def invalidate_shopping_carts(user_ids):
+    """Сброс закэшированных списков покупок пользователей."""
+    cache.delete_many(
+        [shopping_cart_cache_key(user_id) for user_id in user_ids]
+    )
+
+
+def shopping_cart_queryset(user):
+    return IngredientRecipe.objects.using(
+        router.db_for_write(IngredientRecipe)
+    ).filter(
+        recipe__carts__user=user
+    ).values_list(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        total=Sum('amount')
+    ).order_by('ingredient__name')
+
+
+def shopping_cart_ingredients(user):
+    """Сводный список ингредиентов из списка покупок пользователя.
+
+    Повторные запросы отдаются из кэша. При промахе суммирование
+    выполняется в БД, строки читаются итератором (на PostgreSQL —
+    серверным курсором) и попадают в кэш после полного чтения. Кэш
+    общий для всех процессов, поэтому строки читаются из основной БД.
+    """
+    key = shopping_cart_cache_key(user.id)
+    rows = cache.get(key)
+    if rows is not None:
+        yield from rows
+        return
+    rows = []
+    for row in shopping_cart_queryset(user).iterator(chunk_size=CHUNK_SIZE):
+        rows.append(row)
+        yield row
+    cache.set(key, rows, settings.SHOPPING_CART_CACHE_TIMEOUT)
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_txt(rows):
+    for name, measurement_unit, amount in rows:
+        yield f'{name} ({measurement_unit}) - {amount}\n'
+
+
+def export_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+@lru_cache(maxsize=None)
+def pdf_font():
+    """Шрифт с кириллицей, если он доступен, иначе стандартный."""
+    path = settings.SHOPPING_CART_PDF_FONT
+    if not path or not os.path.exists(path):
+        return 'Helvetica'
+    pdfmetrics.registerFont(TTFont('ShoppingCartFont', path))
+    return 'ShoppingCartFont'
+
+
+def export_pdf(rows):
+    """PDF списка покупок.
+
+    Таблица ссылок PDF пишется в конце, поэтому документ строится
+    целиком до первого байта ответа — во временный файл, который уходит
+    на диск после FILE_UPLOAD_MAX_MEMORY_SIZE, и отдается порциями.
+    """
+    with tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    ) as file:
+        draw_pdf(file, rows)
+        file.seek(0)
+        yield from iter(lambda: file.read(PDF_CHUNK_SIZE), b'')
+
+
+def draw_pdf(file, rows):
+    pdf = canvas.Canvas(file, pagesize=A4)
+    width, height = A4
+    font = pdf_font()
+    pdf.setTitle('Список покупок')
+    pdf.setFont(font, PDF_FONT_SIZE + 4)
+    y = height - PDF_MARGIN
+    pdf.drawString(PDF_MARGIN, y, 'Список покупок')
+    pdf.setFont(font, PDF_FONT_SIZE)
+    y -= PDF_LINE_HEIGHT * 2
+    for name, measurement_unit, amount in rows:
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(
+            PDF_MARGIN, y, f'{name} ({measurement_unit}) - {amount}'
+        )
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'pdf': export_pdf,
+}
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+
+
+def feed_cache_key(user_id):
+    return f'feed:{user_id}'
+
+
+def invalidate_feeds(user_ids):
+    """Сброс закэшированного начала ленты подписок пользователей."""
+    cache.delete_many([feed_cache_key(user_id) for user_id in user_ids])
+
+
+def feed_head(user, queryset, size):
+    """Идентификаторы первых size рецептов ленты пользователя.
+
+    Список хранится в кэше до публикации или удаления рецепта кем-то
+    из авторов, на которых пользователь подписан, или до изменения
+    самих подписок. Список читается из основной БД: с отстающей реплики
+    в кэш попала бы лента без только что опубликованного рецепта.
+    """
+    key = feed_cache_key(user.id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(queryset.using(
+            router.db_for_write(queryset.model)
+        ).values_list('pk', flat=True)[:size])
+        cache.set(key, ids, settings.FEED_CACHE_TIMEOUT)
+    return ids
@@ -1,7 +1,11 @@
-from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.conf import settings
+from django.db.models import Case, IntegerField, When
 from django_filters.rest_framework import FilterSet, filters, BooleanFilter
 
+from .autocomplete import ingredient_index
 from .models import Ingredient, Recipe, Tag
+from .scores import RECIPE_SORTS
+from .search import search_recipes
 
 
 class IngredientFilter(FilterSet):
@@ -13,15 +17,21 @@ class IngredientFilter(FilterSet):
         fields = ('name',)
 
     def filter_name(self, queryset, name, value):
-        """Метод возвращает кверисет с заданным именем ингредиента."""
-        return queryset.filter(
-            Q(name__istartswith=value) | Q(name__icontains=value)
-        ).annotate(
-            startswith=ExpressionWrapper(
-                Q(name__istartswith=value),
-                output_field=BooleanField()
-            )
-        ).order_by('-startswith')
+        """Метод возвращает кверисет с заданным именем ингредиента.
+
+        Поиск идет по индексу в памяти: сначала совпадения по началу
+        названия, затем по подстроке, не больше
+        INGREDIENT_AUTOCOMPLETE_LIMIT штук.
+        """
+        ids = ingredient_index.search(
+            value, settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        )
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *(When(pk=pk, then=position) for position, pk in enumerate(ids)),
+            output_field=IntegerField()
+        ))
 
 
 class RecipeFilter(FilterSet):
@@ -30,10 +40,18 @@ class RecipeFilter(FilterSet):
     is_favorited = BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    sort = filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_SORTS],
+        method='filter_sort'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+            'search', 'sort'
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
@@ -44,3 +62,17 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(carts__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, описанию и ингредиентам."""
+        return search_recipes(queryset, value)
+
+    def filter_sort(self, queryset, name, value):
+        """Сортировка по предрасчитанной оценке из RecipeScore.
+
+        Рецепты без оценки (созданные до первого пересчета) не попадают
+        в выдачу, зато сортировка идет по индексу таблицы оценок.
+        """
+        return queryset.filter(score__isnull=False).select_related(
+            'score'
+        ).order_by(*RECIPE_SORTS[value])
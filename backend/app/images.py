@@ -0,0 +1,103 @@
+import base64
+import binascii
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+from rest_framework import serializers
+from sorl.thumbnail import delete, get_thumbnail
+
+FORMATS = {
+    'jpeg': 'JPEG',
+    'jpg': 'JPEG',
+    'png': 'PNG',
+    'gif': 'GIF',
+    'webp': 'WEBP',
+}
+
+
+def decode_base64_image(data):
+    """Картинка из data URI с проверкой размера до декодирования.
+
+    Переносы строк и пробелы внутри base64 (клиенты переносят по 76
+    символов) допускаются, прочие посторонние символы — нет. Формат и
+    разрешение проверяются по заголовку; перекодирование и варианты
+    делает фоновая задача process_recipe_image.
+    """
+    header, _, payload = data.partition(';base64,')
+    ext = header.split('/')[-1].lower()
+    if ext not in FORMATS:
+        raise serializers.ValidationError(
+            'Неподдерживаемый формат изображения.'
+        )
+    payload = ''.join(payload.split())
+    if len(payload) * 3 // 4 > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise serializers.ValidationError('Изображение слишком большое.')
+    try:
+        file = ContentFile(
+            base64.b64decode(payload, validate=True), name=f'temp.{ext}'
+        )
+    except binascii.Error:
+        raise serializers.ValidationError('Некорректные данные base64.')
+    check_image(file)
+    return file
+
+
+def check_image(file):
+    """Проверка формата и разрешения по заголовку, без загрузки пикселей."""
+    try:
+        image = Image.open(file)
+    except (OSError, Image.DecompressionBombError):
+        raise serializers.ValidationError('Файл не является изображением.')
+    width, height = image.size
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            'Слишком большое разрешение изображения.'
+        )
+    file.seek(0)
+
+
+def bound_image(file, name):
+    """Уменьшение картинки до RECIPE_IMAGE_MAX_SIDE.
+
+    Если картинка уже в пределах, возвращается исходный file.
+    """
+    image = Image.open(file)
+    max_side = settings.RECIPE_IMAGE_MAX_SIDE
+    if max(image.size) <= max_side:
+        return file
+    image_format = image.format
+    image.thumbnail((max_side, max_side))
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=settings.RECIPE_IMAGE_QUALITY)
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+def image_variant(image, variant):
+    """WebP-вариант картинки из RECIPE_IMAGE_VARIANTS (через sorl)."""
+    return get_thumbnail(
+        image,
+        settings.RECIPE_IMAGE_VARIANTS[variant],
+        format='WEBP',
+        quality=settings.RECIPE_IMAGE_QUALITY,
+        upscale=False,
+    )
+
+
+def build_image_variants(image):
+    """Создает все варианты картинки, возвращает их имена в хранилище."""
+    if not image:
+        return {}
+    return {
+        variant: image_variant(image, variant).name
+        for variant in settings.RECIPE_IMAGE_VARIANTS
+    }
+
+
+def delete_image_variants(image):
+    """Удаляет файлы вариантов картинки и их записи в хранилище sorl."""
+    if image:
+        delete(image, delete_file=False)
@@ -0,0 +1,146 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+_executor = None
+_executor_lock = threading.Lock()
+_sweeper = None
+
+
+def job(func):
+    """Регистрация функции как фоновой задачи."""
+    registry[func.__name__] = func
+    return func
+
+
+def enqueue(name, user=None, **kwargs):
+    """Постановка задачи в очередь после фиксации транзакции.
+
+    JOBS_BACKEND: thread — пул потоков в текущем процессе, sync — сразу
+    в текущем потоке, db — только запись в БД для команды run_jobs.
+    Задачи, потерянные вместе с процессом, подбирает sweep_jobs.
+    """
+    instance = Job.objects.create(
+        name=name, user=user, kwargs=json.dumps(kwargs)
+    )
+    if settings.JOBS_BACKEND == 'thread':
+        transaction.on_commit(
+            lambda: executor().submit(run_in_thread, instance.pk)
+        )
+    elif settings.JOBS_BACKEND == 'sync':
+        transaction.on_commit(lambda: run_job(instance.pk))
+    return instance
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.JOBS_WORKERS,
+                thread_name_prefix='jobs'
+            )
+    start_sweeper()
+    return _executor
+
+
+def start_sweeper():
+    """Периодический sweep_jobs в процессе с JOBS_BACKEND=thread.
+
+    Вызывается при создании пула и при старте воркера gunicorn
+    (post_worker_init), чтобы новый процесс подбирал задачи прежнего.
+    """
+    global _sweeper
+    if settings.JOBS_BACKEND != 'thread':
+        return
+    with _executor_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(
+                target=sweep_forever, name='jobs-sweeper', daemon=True
+            )
+            _sweeper.start()
+
+
+def sweep_forever():
+    while True:
+        time.sleep(settings.JOBS_SWEEP_SECONDS)
+        try:
+            for job_id in sweep_jobs():
+                executor().submit(run_in_thread, job_id)
+        except Exception:
+            logger.exception('Job sweep failed')
+        finally:
+            connection.close()
+
+
+def stale_before():
+    return timezone.now() - timedelta(seconds=settings.JOBS_STALE_SECONDS)
+
+
+def recover_jobs():
+    """Возврат задач, брошенных упавшим или перезапущенным процессом.
+
+    Задача в RUNNING дольше JOBS_STALE_SECONDS возвращается в PENDING,
+    а после JOBS_MAX_ATTEMPTS запусков помечается FAILED.
+    """
+    stale = Job.objects.filter(status=Job.RUNNING, started__lt=stale_before())
+    stale.filter(attempts__gte=settings.JOBS_MAX_ATTEMPTS).update(
+        status=Job.FAILED, error='Worker lost', finished=timezone.now()
+    )
+    stale.update(status=Job.PENDING)
+
+
+def sweep_jobs():
+    """id задач, которые никто не взял за JOBS_STALE_SECONDS.
+
+    Сюда попадают возвращенные recover_jobs и те, чей процесс
+    завершился до on_commit.
+    """
+    recover_jobs()
+    return list(Job.objects.filter(
+        status=Job.PENDING, created__lt=stale_before()
+    ).order_by('created').values_list('pk', flat=True)[:100])
+
+
+def run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        connection.close()
+
+
+def run_job(job_id):
+    """Выполнение задачи, если ее еще не забрал другой обработчик."""
+    claimed = Job.objects.filter(
+        pk=job_id, status=Job.PENDING
+    ).update(
+        status=Job.RUNNING, started=timezone.now(),
+        attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return
+    instance = Job.objects.get(pk=job_id)
+    try:
+        result = registry[instance.name](**json.loads(instance.kwargs))
+    except Exception as error:
+        logger.exception('Job %s (%s) failed', job_id, instance.name)
+        Job.objects.filter(pk=job_id).update(
+            status=Job.FAILED, error=str(error), finished=timezone.now()
+        )
+    else:
+        Job.objects.filter(pk=job_id).update(
+            status=Job.DONE, result=result or '', finished=timezone.now()
+        )
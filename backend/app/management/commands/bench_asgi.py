@@ -0,0 +1,145 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...benchmarks import git_revision, summarize
+
+SERVERS = {
+    'wsgi': ('foodgram.wsgi:application', 'gthread'),
+    'asgi': ('foodgram.asgi:application', 'uvicorn.workers.UvicornWorker'),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError('Server exited before accepting connections')
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise CommandError(f'Server did not start in {timeout} s')
+
+
+def fetch(port, url, delay):
+    """GET по сырому сокету; delay — пауза медленного клиента между
+    строкой запроса и заголовками, на которую сервер держит соединение."""
+    started = time.perf_counter()
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        sock.sendall(f'GET {url} HTTP/1.1\r\n'.encode())
+        if delay:
+            time.sleep(delay)
+        sock.sendall(b'Host: 127.0.0.1\r\nConnection: close\r\n\r\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    status = int(b''.join(chunks)[9:12] or 0)
+    return time.perf_counter() - started, status
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI (gthread) and ASGI (uvicorn) throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--urls', nargs='+',
+            default=['/api/tags/', '/api/ingredients/?name=a',
+                     '/api/recipes/'],
+        )
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--client-delay', type=float, default=0.05,
+            help='Seconds each client waits before sending headers'
+        )
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--servers', nargs='+', choices=SERVERS, default=list(SERVERS)
+        )
+        parser.add_argument('--startup-timeout', type=float, default=30)
+        parser.add_argument('--output', help='Write JSON to this file')
+
+    def handle(self, *args, **options):
+        results = []
+        self.stdout.write(
+            'server  url                              rps   p50 ms   p99 ms'
+            '  errors'
+        )
+        for server in options['servers']:
+            port = free_port()
+            process = self.start(server, port, options)
+            try:
+                wait_for_port(port, process, options['startup_timeout'])
+                for url in options['urls']:
+                    rps, summary, errors = self.measure(port, url, options)
+                    results.append({
+                        'server': server,
+                        'url': url,
+                        'requests_per_second': round(rps, 1),
+                        'errors': errors,
+                        **summary,
+                    })
+                    self.stdout.write(
+                        f'{server:<7} {url:<28} {rps:>8.1f} '
+                        f'{summary["p50_ms"]:>8.2f} {summary["p99_ms"]:>8.2f}'
+                        f' {errors:>7}'
+                    )
+            finally:
+                process.terminate()
+                process.wait()
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'revision': git_revision(),
+                    'concurrency': options['concurrency'],
+                    'client_delay': options['client_delay'],
+                    'threads': options['threads'],
+                    'results': results,
+                }, file, indent=2)
+
+    def start(self, server, port, options):
+        """Один процесс gunicorn с настройками из gunicorn.conf.py."""
+        application, worker_class = SERVERS[server]
+        env = dict(
+            os.environ,
+            GUNICORN_BIND=f'127.0.0.1:{port}',
+            GUNICORN_WORKER_CLASS=worker_class,
+            GUNICORN_WORKERS='1',
+            GUNICORN_THREADS=str(options['threads']),
+            ASGI_THREADS=str(options['threads']),
+        )
+        return subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn.app.wsgiapp', application,
+             '--config', 'gunicorn.conf.py', '--log-level', 'warning'],
+            cwd=settings.BASE_DIR, env=env,
+        )
+
+    def measure(self, port, url, options):
+        def request(_):
+            return fetch(port, url, options['client_delay'])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as clients:
+            responses = list(clients.map(request, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency, _ in responses]
+        errors = sum(1 for _, status in responses if status != 200)
+        return len(latencies) / elapsed, summarize(latencies), errors
@@ -0,0 +1,49 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from ...autocomplete import ingredient_index
+from ...models import Ingredient
+
+
+def orm_search(value, limit):
+    """Прежний путь фильтра: istartswith OR icontains по всей таблице."""
+    return list(Ingredient.objects.filter(
+        Q(name__istartswith=value) | Q(name__icontains=value)
+    ).annotate(
+        startswith=ExpressionWrapper(
+            Q(name__istartswith=value), output_field=BooleanField()
+        )
+    ).order_by('-startswith').values_list('pk', flat=True)[:limit])
+
+
+class Command(BaseCommand):
+    help = 'Compare the ingredient autocomplete index with the ORM filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('No ingredients, load the catalogue first.')
+        rng = random.Random(options['seed'])
+        queries = []
+        for _ in range(options['queries']):
+            name = rng.choice(names)
+            start = rng.choice((0, 0, rng.randrange(len(name))))
+            queries.append(name[start:start + rng.randint(1, 4)])
+        limit = settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        ingredient_index.ensure_fresh()
+        for label, search in (
+            ('orm', orm_search), ('index', ingredient_index.search)
+        ):
+            started = time.perf_counter()
+            for query in queries:
+                search(query, limit)
+            elapsed = (time.perf_counter() - started) * 1000 / len(queries)
+            self.stdout.write(f'{label:>5}: {elapsed:.3f} ms/query')
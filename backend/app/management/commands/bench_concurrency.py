@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from ...benchmarks import git_revision, summarize
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI-сервер с постоянным пулом потоков, как воркер gthread.
+
+    Потоки живут между запросами, поэтому постоянные соединения с БД
+    переиспользуются так же, как в gunicorn.
+    """
+
+    def __init__(self, *args, threads, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec with and without persistent DB connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/recipes/')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--max-ages', type=int, nargs='+', default=[0, 60],
+            help='CONN_MAX_AGE values to compare'
+        )
+        parser.add_argument('--output', help='Write JSON to this file')
+
+    def handle(self, *args, **options):
+        opened = []
+        lock = threading.Lock()
+
+        def count_connection(sender, connection, **kwargs):
+            with lock:
+                opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        results = []
+        self.stdout.write('max_age      rps   p50 ms   p99 ms  connections')
+        for max_age in options['max_ages']:
+            for connection in connections.all():
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                connection.close()
+            opened.clear()
+            rps, summary = self.measure(options)
+            results.append({
+                'conn_max_age': max_age,
+                'requests_per_second': round(rps, 1),
+                'connections_opened': len(opened),
+                **summary,
+            })
+            self.stdout.write(
+                f'{max_age:>7} {rps:>8.1f} {summary["p50_ms"]:>8.2f} '
+                f'{summary["p99_ms"]:>8.2f} {len(opened):>12}'
+            )
+        connection_created.disconnect(count_connection)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'revision': git_revision(),
+                    'url': options['url'],
+                    'concurrency': options['concurrency'],
+                    'results': results,
+                }, file, indent=2)
+
+    def measure(self, options):
+        server = PooledWSGIServer(
+            ('127.0.0.1', 0), QuietRequestHandler, threads=options['threads']
+        )
+        server.set_app(WSGIHandler())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f'http://127.0.0.1:{server.server_port}{options["url"]}'
+
+        def fetch(_):
+            started = time.perf_counter()
+            with urllib.request.urlopen(url) as response:
+                response.read()
+            return time.perf_counter() - started
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options['concurrency']) as clients:
+                latencies = list(
+                    clients.map(fetch, range(options['requests']))
+                )
+            elapsed = time.perf_counter() - started
+        finally:
+            server.shutdown()
+            server.server_close()
+        return len(latencies) / elapsed, summarize(latencies)
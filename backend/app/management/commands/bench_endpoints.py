@@ -0,0 +1,97 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+
+from ...benchmarks import git_revision, summarize
+from ...models import Recipe
+
+ENDPOINTS = (
+    ('tags', False, '/api/tags/'),
+    ('ingredients autocomplete', False, '/api/ingredients/?name=мол'),
+    ('recipes anonymous', False, '/api/recipes/'),
+    ('recipes', True, '/api/recipes/?limit=20'),
+    ('recipes deep page', True, '/api/recipes/?page={last_page}'),
+    ('recipes by tag', True, '/api/recipes/?tags=breakfast&tags=lunch'),
+    ('recipe search', True, '/api/recipes/?search=рецепт'),
+    ('recipe detail', True, '/api/recipes/{recipe_id}/'),
+    ('subscriptions', True, '/api/users/subscriptions/?recipes_limit=3'),
+    ('users', True, '/api/users/'),
+    ('shopping cart download', True, '/api/recipes/download_shopping_cart/'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the main API endpoints through the Django test client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--user', help='Username to authenticate as')
+        parser.add_argument('--output', help='Write JSON to this file')
+
+    def handle(self, *args, **options):
+        user = self.benchmark_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        clients = {
+            False: Client(),
+            True: Client(HTTP_AUTHORIZATION=f'Token {token.key}'),
+        }
+        recipe = Recipe.objects.first()
+        params = {
+            'recipe_id': recipe.id if recipe else 0,
+            'last_page': max(Recipe.objects.count() // 6, 1),
+        }
+        results = []
+        for name, authenticated, url in ENDPOINTS:
+            url = url.format(**params)
+            results.append(self.measure(
+                clients[authenticated], name, url, options['requests']
+            ))
+        report = json.dumps({
+            'revision': git_revision(),
+            'user': user.username,
+            'requests': options['requests'],
+            'endpoints': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        self.stdout.write(report)
+
+    def benchmark_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.filter(
+                following__isnull=False, carts__isnull=False
+            ).first() or User.objects.first()
+        if user is None:
+            raise CommandError('No users, run generate_data first.')
+        return user
+
+    def measure(self, client, name, url, requests):
+        latencies = []
+        queries = []
+        status = None
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            status = response.status_code
+        return {
+            'name': name,
+            'url': url,
+            'status': status,
+            'queries': max(queries),
+            **summarize(latencies),
+        }
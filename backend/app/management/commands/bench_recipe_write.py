@@ -0,0 +1,61 @@
+import time
+
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import CaptureQueriesContext
+
+from users.models import User
+
+from ...models import Ingredient, Recipe
+from ...serializers import add_ingredient
+
+
+class Command(BaseCommand):
+    help = 'Latency of the recipe write path versus ingredient count'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--counts', type=int, nargs='+', default=[1, 5, 10, 25, 50]
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)[
+                :max(options['counts'])
+            ]
+        )
+        if len(ingredient_ids) < max(options['counts']):
+            raise CommandError(
+                'Not enough ingredients, load the catalogue first.'
+            )
+        self.stdout.write('ingredients  ms/recipe  queries')
+        for count in options['counts']:
+            elapsed, queries = self.measure(
+                ingredient_ids[:count], options['repeat']
+            )
+            self.stdout.write(f'{count:>11}  {elapsed:>9.2f}  {queries:>7}')
+
+    def measure(self, ingredient_ids, repeat):
+        """Создание рецептов в транзакции, которая затем откатывается."""
+        ingredients = [
+            {'id': ingredient_id, 'amount': index + 1}
+            for index, ingredient_id in enumerate(ingredient_ids)
+        ]
+        with transaction.atomic():
+            author = User.objects.create(
+                username='bench_recipe_write', email='bench@foodgram.local'
+            )
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                for number in range(repeat):
+                    with transaction.atomic():
+                        recipe = Recipe.objects.create(
+                            author=author, name=f'bench {number}',
+                            image='recipes/bench.jpg', text='bench',
+                            cooking_time=1,
+                        )
+                        add_ingredient(ingredients, recipe)
+            elapsed = (time.perf_counter() - started) * 1000 / repeat
+            transaction.set_rollback(True)
+        return elapsed, len(queries) // repeat
@@ -0,0 +1,64 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from ...benchmarks import summarize
+from ...models import Ingredient, Recipe
+from ...search import WORD, search_recipes
+
+
+def icontains_search(value, limit):
+    """Поиск без индекса: icontains по названию, описанию и ингредиентам."""
+    return list(Recipe.objects.filter(
+        Q(name__icontains=value)
+        | Q(text__icontains=value)
+        | Q(ingredients__name__icontains=value)
+    ).distinct().order_by('-pub_date', '-id').values_list(
+        'pk', flat=True
+    )[:limit])
+
+
+def index_search(value, limit):
+    return list(search_recipes(
+        Recipe.objects.all(), value
+    ).values_list('pk', flat=True)[:limit])
+
+
+class Command(BaseCommand):
+    help = 'Compare full-text recipe search with icontains filtering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        words = set()
+        for name in Recipe.objects.values_list('name', flat=True)[:1000]:
+            words.update(WORD.findall(name))
+        for name in Ingredient.objects.filter(
+            ingredients_recipes__isnull=False
+        ).values_list('name', flat=True).distinct()[:1000]:
+            words.update(WORD.findall(name))
+        words = sorted(word for word in words if len(word) > 2)
+        if not words:
+            raise CommandError('No recipes, run generate_data first.')
+        rng = random.Random(options['seed'])
+        queries = [rng.choice(words) for _ in range(options['queries'])]
+        self.stdout.write('method     p50 ms   p90 ms   found')
+        for label, search in (
+            ('icontains', icontains_search), ('index', index_search)
+        ):
+            latencies = []
+            found = 0
+            for query in queries:
+                started = time.perf_counter()
+                found += len(search(query, options['limit']))
+                latencies.append(time.perf_counter() - started)
+            summary = summarize(latencies)
+            self.stdout.write(
+                f'{label:<9} {summary["p50_ms"]:>8.3f} '
+                f'{summary["p90_ms"]:>8.3f} {found / len(queries):>7.1f}'
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ...scores import compute_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute popular and trending recipe scores, run periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = compute_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Scored recipes: {total}'))
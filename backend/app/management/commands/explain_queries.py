@@ -0,0 +1,76 @@
+import re
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from users.models import User
+
+from ...exports import shopping_cart_queryset
+from ...models import Ingredient, IngredientRecipe
+from ...scores import RECIPE_SORTS
+from ...search import search_recipes
+from ...views import RecipeViewSet
+
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?!\s+USING)'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+def endpoint_queries(user):
+    """Основные запросы эндпоинтов: (название, кверисет, СУБД или None)."""
+    view = RecipeViewSet(request=SimpleNamespace(user=user))
+    recipes = view.get_queryset()
+    return (
+        ('recipe list', recipes[:6], None),
+        ('recipes by author', recipes.filter(author=user)[:6], None),
+        ('recipes by tag', recipes.filter(tags__slug='breakfast')[:6], None),
+        ('favorited recipes', recipes.filter(favorites__user=user)[:6], None),
+        ('recipes in cart', recipes.filter(carts__user=user)[:6], None),
+        ('popular recipes', recipes.filter(score__isnull=False).order_by(
+            *RECIPE_SORTS['popular']
+        )[:6], None),
+        ('subscriptions', User.objects.filter(following__user=user)[:6], None),
+        ('recipe search', search_recipes(recipes, 'суп')[:6], 'postgresql'),
+        ('ingredient autocomplete', Ingredient.objects.filter(
+            pk__in=[1, 2, 3]
+        ), None),
+        ('recipe ingredients', IngredientRecipe.objects.filter(
+            recipe_id__in=[1, 2, 3]
+        ).select_related('ingredient'), None),
+        ('shopping cart', shopping_cart_queryset(user), None),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the main endpoint queries and fail on full scans'
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Unsupported database: {connection.vendor}')
+        user = User.objects.first() or User(pk=0)
+        failures = []
+        for name, queryset, vendor in endpoint_queries(user):
+            if vendor not in (None, connection.vendor):
+                continue
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = queryset.explain()
+            scans = sorted(set(pattern.findall(plan)))
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{name}:\n{plan}\n')
+            if scans:
+                failures.append(f'{name}: {", ".join(scans)}')
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: full scan of {", ".join(scans)}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+        if failures:
+            raise CommandError(
+                'Full table scans found: ' + '; '.join(failures)
+            )
@@ -0,0 +1,145 @@
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from users.models import Subscribe, User
+
+from ...models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                       ShoppingCart, Tag)
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset of users, recipes and their links'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes-per-user', type=int, default=10)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--prefix', default='demo')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', stdout=self.stdout)
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)
+        )
+        self.tag_ids = self.create_tags()
+        user_ids = self.create_users(options['users'], options['prefix'])
+        recipe_ids = self.create_recipes(
+            user_ids, options['recipes_per_user'], options['prefix']
+        )
+        self.link_ingredients(recipe_ids, options['ingredients_per_recipe'])
+        self.create_pairs(
+            Subscribe, 'user_id', 'following_id', user_ids, user_ids,
+            options['subscriptions_per_user']
+        )
+        self.create_pairs(
+            Favorite, 'user_id', 'recipe_id', user_ids, recipe_ids,
+            options['favorites_per_user']
+        )
+        self.create_pairs(
+            ShoppingCart, 'user_id', 'recipe_id', user_ids, recipe_ids,
+            options['cart_per_user']
+        )
+        # bulk_create не отправляет сигналы, счетчики пересчитываются разом.
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('compute_recipe_scores', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Users: {len(user_ids)}, recipes: {len(recipe_ids)}'
+        ))
+
+    def bulk_create(self, model, objects):
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def create_tags(self):
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count, prefix):
+        password = make_password(prefix)
+        self.bulk_create(User, (
+            User(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name='Имя', last_name='Фамилия', password=password,
+            )
+            for number in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=prefix
+        ).values_list('id', flat=True))
+
+    def create_recipes(self, user_ids, per_user, prefix):
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=user_id, name=f'{prefix} рецепт {number}',
+                image='recipes/temp.jpeg',
+                text='Описание рецепта ' * self.rng.randint(5, 50),
+                cooking_time=self.rng.randint(5, 180),
+            )
+            for user_id in user_ids for number in range(per_user)
+        ))
+        recipe_ids = list(Recipe.objects.filter(
+            author_id__in=user_ids
+        ).values_list('id', flat=True))
+        self.bulk_create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                self.tag_ids, self.rng.randint(1, len(self.tag_ids))
+            )
+        ))
+        return recipe_ids
+
+    def link_ingredients(self, recipe_ids, per_recipe):
+        amounts = (50, 100, 150, 200, 250, 500)
+        self.bulk_create(IngredientRecipe, (
+            IngredientRecipe(
+                recipe_id=recipe_id, ingredient_id=ingredient_id,
+                amount=self.rng.choice(amounts)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.rng.sample(
+                self.ingredient_ids, min(per_recipe, len(self.ingredient_ids))
+            )
+        ))
+
+    def create_pairs(self, model, left, right, left_ids, right_ids, per_left):
+        self.bulk_create(model, (
+            model(**{left: left_id, right: right_id})
+            for left_id in left_ids
+            for right_id in self.rng.sample(
+                right_ids, min(per_left, len(right_ids))
+            )
+            if left_id != right_id
+        ))
@@ -0,0 +1,98 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...cache import INGREDIENTS_VERSION, bump_version
+from ...models import Ingredient
+
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Потоковое чтение JSON-массива объектов без загрузки всего файла."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and buffer[position:position + 1] == '[':
+                started = True
+                position += 1
+                continue
+            if buffer[position:position + 1] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item['name'], item['measurement_unit']
+        if not chunk:
+            return
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Load ingredients from a CSV or JSON file, skipping existing rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError(f'Unsupported file type: {path}')
+        batch_size = options['batch_size']
+        existing = Ingredient.objects.count()
+        processed = 0
+        started = time.perf_counter()
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = reader(file)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(
+                    (
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in dict.fromkeys(batch)
+                    ),
+                    batch_size=batch_size,
+                    ignore_conflicts=True,
+                )
+                processed += len(batch)
+        elapsed = time.perf_counter() - started
+        bump_version(INGREDIENTS_VERSION)
+        created = Ingredient.objects.count() - existing
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} rows, created {created} ingredients '
+            f'in {elapsed:.2f}s ({processed / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount denormalized favorite, cart, recipe and follower counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report rows whose counters drifted'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = reconcile_counters(dry_run=options['dry_run'])
+        for counter, rows in drift.items():
+            self.stdout.write(f'{counter}: {rows} rows drifted')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Counters reconciled'))
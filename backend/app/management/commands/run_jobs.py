@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...jobs import recover_jobs, run_job, sweep_jobs
+from ...models import Job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (worker for JOBS_BACKEND=db)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the queue is empty'
+        )
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        while True:
+            if settings.JOBS_BACKEND == 'db':
+                recover_jobs()
+                job_ids = list(Job.objects.filter(
+                    status=Job.PENDING
+                ).order_by('created').values_list('pk', flat=True)[:100])
+            else:
+                job_ids = sweep_jobs()
+            for job_id in job_ids:
+                run_job(job_id)
+            if not job_ids:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.db.models.query import QuerySet
+
+from users.models import Subscribe, User
+
+from .models import Favorite, Recipe, ShoppingCart
+
+RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'carts': (ShoppingCart, 'recipe_id'),
+    'follows': (Subscribe, 'following_id'),
+}
+
+
+class Membership:
+    """Избранное, список покупок и подписки пользователя в пределах запроса.
+
+    При первой проверке загружаются связи для всех объектов страницы,
+    по одному запросу на вид связи; остальные проверки идут по множествам.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.checked = defaultdict(set)
+        self.found = defaultdict(set)
+
+    def contains(self, relation, pk, candidates):
+        if pk not in self.checked[relation]:
+            ids = ({pk} | set(candidates())) - self.checked[relation]
+            model, field = RELATIONS[relation]
+            self.found[relation].update(model.objects.filter(
+                user=self.user, **{f'{field}__in': ids}
+            ).values_list(field, flat=True))
+            self.checked[relation] |= ids
+        return pk in self.found[relation]
+
+
+def get_membership(serializer):
+    request = serializer.context.get('request')
+    if request is None or request.user.is_anonymous:
+        return None
+    if not hasattr(request, 'membership'):
+        request.membership = Membership(request.user)
+    return request.membership
+
+
+def page_objects(serializer):
+    """Объекты, которые сериализует корневой сериализатор."""
+    instance = serializer.root.instance
+    if isinstance(instance, (list, tuple, QuerySet)):
+        return instance
+    return [] if instance is None else [instance]
+
+
+def recipe_ids(serializer):
+    return [
+        obj.pk for obj in page_objects(serializer) if isinstance(obj, Recipe)
+    ]
+
+
+def user_ids(serializer):
+    return [
+        obj.author_id if isinstance(obj, Recipe) else obj.pk
+        for obj in page_objects(serializer)
+        if isinstance(obj, (Recipe, User))
+    ]
+
+
+def is_favorited(serializer, recipe):
+    membership = get_membership(serializer)
+    return membership is not None and membership.contains(
+        'favorites', recipe.pk, lambda: recipe_ids(serializer)
+    )
+
+
+def is_in_shopping_cart(serializer, recipe):
+    membership = get_membership(serializer)
+    return membership is not None and membership.contains(
+        'carts', recipe.pk, lambda: recipe_ids(serializer)
+    )
+
+
+def is_subscribed(serializer, user):
+    membership = get_membership(serializer)
+    return membership is not None and membership.contains(
+        'follows', user.pk, lambda: user_ids(serializer)
+    )
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:50
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Слияние повторов ингредиентов перед уникальным ограничением.
+
+    Прежняя команда csv при каждом запуске добавляла все ингредиенты
+    заново. Строки IngredientRecipe переводятся на ингредиент с
+    наименьшим id, остальные копии удаляются.
+    """
+    Ingredient = apps.get_model('app', 'Ingredient')
+    IngredientRecipe = apps.get_model('app', 'IngredientRecipe')
+    groups = Ingredient.objects.order_by().values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('pk'), total=Count('pk')).filter(total__gt=1)
+    for group in groups.iterator():
+        copies = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(pk=group['keep']).values_list('pk', flat=True))
+        IngredientRecipe.objects.filter(ingredient__in=copies).update(
+            ingredient=group['keep']
+        )
+        Ingredient.objects.filter(pk__in=copies).delete()
+
+
+class Migration(migrations.Migration):
+
+    # Слияние фиксируется отдельной транзакцией: PostgreSQL не изменяет
+    # таблицу с отложенными проверками внешних ключей.
+    atomic = False
+
+    dependencies = [
+        ('app', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicates, migrations.RunPython.noop, atomic=True
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_measurement_unit'),
+        ),
+    ]
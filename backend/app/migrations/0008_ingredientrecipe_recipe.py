@@ -0,0 +1,21 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_recipe_scores'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingredientrecipe',
+            name='ingredient_amount_idx',
+        ),
+        migrations.AddField(
+            model_name='ingredientrecipe',
+            name='recipe',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ingredients_recipes', to='app.recipe'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+
+def link_tables(apps, schema_editor):
+    """Таблица строк IngredientRecipe, прежняя M2M-таблица Recipe.ingredients
+    и ее столбцы."""
+    quote = schema_editor.quote_name
+    rows = apps.get_model('app', 'IngredientRecipe')._meta
+    links = apps.get_model('app', 'Recipe')._meta.get_field(
+        'ingredients'
+    ).remote_field.through._meta
+    return (
+        quote(rows.db_table),
+        quote(links.db_table),
+        quote(links.get_field('recipe').column),
+        quote(links.get_field('ingredientrecipe').column),
+    )
+
+
+def move_links(apps, schema_editor):
+    """Общие строки IngredientRecipe становятся строками рецептов.
+
+    Строка старой схемы могла входить в несколько рецептов: для каждого
+    рецепта создается своя строка, повторы ингредиента в рецепте
+    суммируются. Связи и общие строки после переноса удаляются.
+    """
+    table, links, recipe_id, row_id = link_tables(apps, schema_editor)
+    schema_editor.execute(
+        f'INSERT INTO {table} (recipe_id, ingredient_id, amount) '
+        f'SELECT link.{recipe_id}, shared.ingredient_id, SUM(shared.amount) '
+        f'FROM {links} link JOIN {table} shared '
+        f'ON shared.id = link.{row_id} '
+        f'WHERE shared.recipe_id IS NULL '
+        f'GROUP BY link.{recipe_id}, shared.ingredient_id'
+    )
+    schema_editor.execute(f'DELETE FROM {links}')
+    schema_editor.execute(f'DELETE FROM {table} WHERE recipe_id IS NULL')
+
+
+def restore_links(apps, schema_editor):
+    table, links, recipe_id, row_id = link_tables(apps, schema_editor)
+    schema_editor.execute(
+        f'INSERT INTO {links} ({recipe_id}, {row_id}) '
+        f'SELECT recipe_id, id FROM {table} WHERE recipe_id IS NOT NULL'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_ingredientrecipe_recipe'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_links, restore_links),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_move_ingredient_links'),
+    ]
+
+    operations = [
+        # Django не меняет through у существующего M2M: в БД удаляется
+        # прежняя таблица связей, в состоянии поле переключается на
+        # IngredientRecipe, чьи строки уже перенесены в 0009.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RemoveField(
+                    model_name='recipe',
+                    name='ingredients',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='ingredients',
+                    field=models.ManyToManyField(related_name='recipe', through='app.IngredientRecipe', to='app.Ingredient'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='ingredientrecipe',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredients_recipes', to='app.recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+    ]
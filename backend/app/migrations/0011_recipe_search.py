@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:51
+
+import app.fields
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_recipe_ingredients_through'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearch',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='app.recipe')),
+                ('document', app.fields.FullTextField(db_column='app_recipe_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'app_recipe_search',
+                'managed': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+SEARCH_VECTOR_INDEX = 'recipe_search_vector_idx'
+TRIGRAM_INDEX = 'ingredient_name_trgm_idx'
+
+
+def create_search_vector_index(apps, schema_editor):
+    """GIN-индекс по Recipe.search_vector, только на PostgreSQL.
+
+    Триграммный индекс по названию ингредиента, который раньше
+    создавался при каждом migrate, удаляется: автодополнение работает
+    по индексу в памяти (app.autocomplete). Расширение pg_trgm не
+    трогается — для его удаления нужны права суперпользователя.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('app', 'Recipe')._meta.db_table
+    quote = schema_editor.quote_name
+    schema_editor.execute(f'DROP INDEX IF EXISTS {quote(TRIGRAM_INDEX)}')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {quote(SEARCH_VECTOR_INDEX)} '
+        f'ON {quote(table)} USING gin (search_vector)'
+    )
+
+
+def drop_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'DROP INDEX IF EXISTS {schema_editor.quote_name(SEARCH_VECTOR_INDEX)}'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_job_recovery'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_search_vector_index, drop_search_vector_index
+        ),
+    ]
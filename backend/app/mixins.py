@@ -1,4 +1,14 @@
-from rest_framework import mixins, viewsets
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import mixins, status, viewsets
+from rest_framework.response import Response
+
+from .cache import get_version
 
 
 class ListRetrieveViewSet(mixins.ListModelMixin,
@@ -6,3 +16,76 @@ class ListRetrieveViewSet(mixins.ListModelMixin,
                           viewsets.GenericViewSet
                           ):
     pass
+
+
+class CachedCatalogueMixin:
+    """Кэширование ответов справочника с поддержкой ETag.
+
+    ETag строится из версии справочника (catalogue_version в app.cache),
+    пути запроса и формата ответа. Совпавший If-None-Match дает 304 без
+    обращения к БД, иначе данные берутся из кэша или собираются заново.
+    Версию меняют сигналы при изменении записей справочника. Кэш
+    заполняется только из основной БД: ответ, собранный с отстающей
+    реплики, жил бы под новой версией до следующего изменения.
+    """
+
+    catalogue_version = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return queryset.using(router.db_for_write(queryset.model))
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        version = get_version(self.catalogue_version)
+        key = hashlib.md5(
+            f'{version}:{request.accepted_renderer.format}:'
+            f'{request.get_full_path()}'.encode()
+        ).hexdigest()
+        etag = f'"{key}"'
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in etags or '*' in etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get(f'catalogue:{key}')
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(
+                    f'catalogue:{key}', response.data,
+                    settings.CATALOGUE_CACHE_TIMEOUT
+                )
+            else:
+                response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+class KeysetPaginationMixin:
+    """Переключение на курсорную пагинацию параметром cursor.
+
+    Без параметра используется обычный pagination_class, так что
+    существующие клиенты с page/limit продолжают работать.
+    """
+
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, '_paginator')
+            and self.keyset_pagination_class is not None
+            and self.keyset_pagination_class.cursor_query_param
+            in self.request.query_params
+        ):
+            self._paginator = self.keyset_pagination_class()
+        return super().paginator
@@ -1,7 +1,10 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from users.models import User
 
+from .fields import FullTextField
+
 
 class Tag(models.Model):
     """Класс тегов рецептов."""
@@ -25,6 +28,12 @@ class Ingredient(models.Model):
     measurement_unit = models.CharField(max_length=200)
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_measurement_unit'
+            )
+        ]
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
 
@@ -35,6 +44,10 @@ class Ingredient(models.Model):
 class IngredientRecipe(models.Model):
     """Класс связующая таблица ингредиентов и рецептов."""
 
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE
+    )
     ingredient = models.ForeignKey(
         Ingredient,
         on_delete=models.CASCADE
@@ -44,6 +57,12 @@ class IngredientRecipe(models.Model):
     )
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            )
+        ]
         default_related_name = 'ingredients_recipes'
         verbose_name = 'Подсчет ингредиентов'
         verbose_name_plural = 'Подсчеты ингредиентов'
@@ -62,9 +81,12 @@ class Recipe(models.Model):
     name = models.CharField(max_length=200)
     image = models.ImageField(
         upload_to='recipes/', null=False, blank=False)
+    thumbnail = models.ImageField(blank=True, editable=False)
+    image_webp = models.ImageField(blank=True, editable=False)
     text = models.TextField()
     ingredients = models.ManyToManyField(
-        IngredientRecipe,
+        Ingredient,
+        through=IngredientRecipe,
         blank=False
     )
     tags = models.ManyToManyField(
@@ -77,9 +99,30 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    carts_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         default_related_name = 'recipe'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -88,6 +131,29 @@ class Recipe(models.Model):
         return self.name
 
 
+class RecipeSearch(models.Model):
+    """Класс полнотекстового индекса рецептов (таблица FTS5 на SQLite).
+
+    Таблицу создает app.search.create_search_table, строки пишутся там же;
+    модель нужна для соединения с рецептами и сортировки по rank.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry'
+    )
+    document = FullTextField(db_column='app_recipe_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'app_recipe_search'
+
+
 class Favorite(models.Model):
     """Класс избранных рецептов."""
 
@@ -99,6 +165,7 @@ class Favorite(models.Model):
         Recipe,
         on_delete=models.CASCADE
     )
+    created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         constraints = [
@@ -108,6 +175,9 @@ class Favorite(models.Model):
             )
         ]
         default_related_name = 'favorites'
+        indexes = [
+            models.Index(fields=['created'], name='favorite_created_idx'),
+        ]
         verbose_name = 'Избранный'
         verbose_name_plural = 'Избранные'
 
@@ -125,6 +195,7 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт, добавленный в список покупок '
     )
+    created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         constraints = [
@@ -135,5 +206,90 @@ class ShoppingCart(models.Model):
         ]
 
         default_related_name = 'carts'
+        indexes = [
+            models.Index(fields=['created'], name='cart_created_idx'),
+        ]
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+
+
+class RecipeScore(models.Model):
+    """Класс предрасчитанных оценок популярности рецептов."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score'
+    )
+    popular = models.FloatField(default=0)
+    trending = models.FloatField(default=0)
+    computed = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-popular', '-recipe'],
+                name='recipe_score_popular_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-recipe'],
+                name='recipe_score_trending_idx'
+            ),
+        ]
+        verbose_name = 'Оценка рецепта'
+        verbose_name_plural = 'Оценки рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.popular} {self.trending}'
+
+
+class Job(models.Model):
+    """Класс фоновых задач."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Пользователь'
+    )
+    name = models.CharField(max_length=100)
+    kwargs = models.TextField(default='{}')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUSES,
+        default=PENDING
+    )
+    result = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        default_related_name = 'jobs'
+        indexes = [
+            models.Index(
+                fields=['status', 'created'],
+                name='job_status_created_idx'
+            ),
+        ]
+        ordering = ('-created',)
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
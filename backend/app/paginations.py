@@ -1,4 +1,13 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .feed import feed_head
 
 
 class LimitPagination(PageNumberPagination):
@@ -6,3 +15,130 @@ class LimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     max_page_size = 20
 
+
+def resolve_field(model, path):
+    """Поле модели по пути вида score__popular."""
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная пагинация по ключу сортировки.
+
+    Следующая страница выбирается условием по значениям ключа последней
+    записи, а не OFFSET, поэтому стоимость страницы не зависит от
+    глубины. Общее количество записей не считается. Вьюсет может
+    заменить ключ атрибутом keyset_ordering.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 20
+    cursor_query_param = 'cursor'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode_cursor(request, queryset.model)
+        if values is not None:
+            queryset = queryset.filter(self.after(values))
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_ordering(self, view):
+        return getattr(view, 'keyset_ordering', None) or self.ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def after(self, values):
+        """Условие «строго после ключа» для сортировки self.ordering."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return [
+                resolve_field(model, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            *relations, name = field.lstrip('-').split('__')
+            owner = obj
+            for relation in relations:
+                owner = getattr(owner, relation)
+            values.append(
+                owner._meta.get_field(name).value_to_string(owner)
+            )
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.last)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(KeysetPagination):
+    """Пагинация ленты подписок.
+
+    Первая страница собирается по закэшированным идентификаторам начала
+    ленты, следующие — обычным курсором по (-pub_date, -id).
+    """
+
+    def get_ordering(self, view):
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.cursor_query_param):
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ids = feed_head(
+            request.user, queryset.order_by(*self.ordering),
+            self.max_page_size + 1
+        )
+        self.has_next = len(ids) > self.page_size
+        recipes = queryset.in_bulk(ids[:self.page_size])
+        page = [recipes[pk] for pk in ids[:self.page_size] if pk in recipes]
+        self.last = page[-1] if page else None
+        return page
@@ -0,0 +1,67 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Favorite, Recipe, RecipeScore, ShoppingCart
+
+# Значения параметра sort и соответствующая сортировка рецептов.
+RECIPE_SORTS = {
+    'popular': ('-score__popular', '-id'),
+    'trending': ('-score__trending', '-id'),
+}
+
+
+def trending_scores(now):
+    """Сумма добавлений в избранное и в списки покупок за окно
+    RECIPE_SCORE_TRENDING_DAYS, вес которых убывает вдвое за
+    RECIPE_SCORE_HALF_LIFE_HOURS."""
+    since = now - timedelta(days=settings.RECIPE_SCORE_TRENDING_DAYS)
+    half_life = settings.RECIPE_SCORE_HALF_LIFE_HOURS * 60 * 60
+    scores = defaultdict(float)
+    for model, weight in (
+        (Favorite, 1.0),
+        (ShoppingCart, settings.RECIPE_SCORE_CART_WEIGHT),
+    ):
+        rows = model.objects.filter(
+            created__gte=since
+        ).values_list('recipe_id', 'created').iterator()
+        for recipe_id, created in rows:
+            age = max((now - created).total_seconds(), 0)
+            scores[recipe_id] += weight * 0.5 ** (age / half_life)
+    return scores
+
+
+def compute_scores(now=None, batch_size=1000):
+    """Пересчет таблицы RecipeScore.
+
+    popular берется из счетчиков рецепта, trending — из недавних
+    добавлений. Таблица заменяется целиком в одной транзакции, так что
+    читатели видят либо старые, либо новые оценки.
+    """
+    now = now or timezone.now()
+    trending = trending_scores(now)
+    cart_weight = settings.RECIPE_SCORE_CART_WEIGHT
+    rows = Recipe.objects.order_by().values_list(
+        'id', 'favorites_count', 'carts_count'
+    ).iterator()
+    scores = (
+        RecipeScore(
+            recipe_id=recipe_id,
+            popular=favorites + cart_weight * carts,
+            trending=trending.get(recipe_id, 0),
+        )
+        for recipe_id, favorites, carts in rows
+    )
+    total = 0
+    with transaction.atomic():
+        RecipeScore.objects.all().delete()
+        while True:
+            batch = list(islice(scores, batch_size))
+            if not batch:
+                return total
+            RecipeScore.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
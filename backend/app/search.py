@@ -0,0 +1,110 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections, router
+from django.db.models import F, TextField, Value
+
+from .models import IngredientRecipe, Recipe, RecipeSearch
+
+SQLITE_TABLE = RecipeSearch._meta.db_table
+SQLITE_SCHEMA = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} '
+    f'USING fts5(name, text, ingredients, tokenize="unicode61")',
+    # rank — bm25 с весами столбцов name, text, ingredients.
+    f"INSERT INTO {SQLITE_TABLE} ({SQLITE_TABLE}, rank) "
+    f"VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+)
+WORD = re.compile(r'\w+')
+
+
+def create_search_table(sender, using, **kwargs):
+    """Полнотекстовая таблица FTS5 для SQLite, rowid — id рецепта.
+
+    На PostgreSQL используется столбец Recipe.search_vector
+    с GIN-индексом (миграция 0013_recipe_search_vector_index).
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in SQLITE_SCHEMA:
+            cursor.execute(statement)
+
+
+def search_documents(recipe_ids):
+    """Название, описание и названия ингредиентов рецептов."""
+    ingredients = {}
+    for recipe_id, name in IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient__name'):
+        ingredients.setdefault(recipe_id, []).append(name)
+    return [
+        (recipe_id, name, text, ' '.join(ingredients.get(recipe_id, ())))
+        for recipe_id, name, text in Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('id', 'name', 'text')
+    ]
+
+
+def update_search_index(recipe_ids):
+    """Пересчет поискового индекса рецептов после сохранения."""
+    recipe_ids = list(recipe_ids)
+    connection = connections[router.db_for_write(Recipe)]
+    if connection.vendor == 'postgresql':
+        config = settings.RECIPE_SEARCH_CONFIG
+        for recipe_id, _, _, ingredients in search_documents(recipe_ids):
+            Recipe.objects.filter(pk=recipe_id).update(search_vector=(
+                SearchVector('name', weight='A', config=config)
+                + SearchVector(
+                    Value(ingredients, output_field=TextField()),
+                    weight='B', config=config
+                )
+                + SearchVector('text', weight='C', config=config)
+            ))
+    elif connection.vendor == 'sqlite':
+        documents = search_documents(recipe_ids)
+        delete_from_search_index(recipe_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SQLITE_TABLE} '
+                f'(rowid, name, text, ingredients) VALUES (%s, %s, %s, %s)',
+                documents
+            )
+
+
+def delete_from_search_index(recipe_ids):
+    connection = connections[router.db_for_write(Recipe)]
+    if connection.vendor != 'sqlite' or not recipe_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})',
+            list(recipe_ids)
+        )
+
+
+def search_recipes(queryset, value):
+    """Рецепты, содержащие все слова запроса, по убыванию релевантности.
+
+    Без поддержки полнотекстового поиска в СУБД — поиск по названию.
+    """
+    words = WORD.findall(value)
+    if not words:
+        return queryset.none()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            ' '.join(words), config=settings.RECIPE_SEARCH_CONFIG
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pub_date', '-id')
+    if connection.vendor == 'sqlite':
+        match = ' '.join('"{}"'.format(word) for word in words)
+        return queryset.filter(
+            search_entry__document__match=match
+        ).order_by('search_entry__rank', '-pub_date', '-id')
+    return queryset.filter(name__icontains=value)
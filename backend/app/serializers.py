@@ -1,27 +1,36 @@
-import base64
-
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 
-from app.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+from app.models import (Favorite, Ingredient, IngredientRecipe, Job, Recipe,
                         ShoppingCart, Tag)
-from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 from rest_framework.validators import UniqueTogetherValidator
 from users.serializers import CustomUserSerializer
 
+from .images import decode_base64_image
+from .jobs import enqueue
+from .membership import is_favorited, is_in_shopping_cart
+
 
 def add_ingredient(ingredients, obj):
-    for ingredient in ingredients:
-        current_ingredient = get_object_or_404(
-            Ingredient, pk=ingredient["id"]
-        )
-        ingredient_recipe, status = IngredientRecipe.objects.get_or_create(
-            ingredient=current_ingredient,
-            amount=ingredient["amount"]
+    """Привязка ингредиентов к рецепту.
+
+    У каждого рецепта свои строки ингредиент/количество: старые строки
+    удаляются одним запросом, новые создаются одним bulk_create, так что
+    таблица не растет при редактировании.
+    """
+    IngredientRecipe.objects.filter(recipe=obj).delete()
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(
+            recipe=obj,
+            ingredient_id=ingredient['id'],
+            amount=ingredient['amount']
         )
-        obj.ingredients.add(ingredient_recipe.id)
+        for ingredient in ingredients
+    )
     return obj
 
 
@@ -45,9 +54,7 @@ class Base64ImageField(serializers.ImageField):
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = decode_base64_image(data)
         return super().to_internal_value(data)
 
 
@@ -119,6 +126,16 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         ]
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список рецептов для пакетного добавления/удаления."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT
+    )
+
+
 class IngredientRecipeSerializer(serializers.ModelSerializer):
     """Получение ингредиентов в списке рецептов."""
 
@@ -146,10 +163,7 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
 class IngredientCreateInRecipeSerializer(serializers.ModelSerializer):
     """Добавление ингредиентов в рецепт."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(write_only=True, min_value=1)
 
     class Meta:
@@ -165,6 +179,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('id',
                   'image',
+                  'thumbnail',
+                  'image_webp',
                   'name',
                   'cooking_time',
                   )
@@ -198,6 +214,16 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     def validate_ingredients(self, value):
         if len(value) < 1:
             raise serializers.ValidationError("Добавьте хотя бы один ингредиент.")
+        ids = {ingredient['id'] for ingredient in value}
+        if len(ids) != len(value):
+            raise serializers.ValidationError(
+                'Ингредиенты не должны повторяться.'
+            )
+        unknown = ids - Ingredient.objects.in_bulk(ids).keys()
+        if unknown:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {sorted(unknown)}.'
+            )
         return value
 
     def validate_tags(self, value):
@@ -207,43 +233,38 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
 
     @transaction.atomic
     def create(self, validated_data):
-        validated_data.pop('ingredients')
+        ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        ingredients = self.initial_data.pop('ingredients')
         tags = self.initial_data.pop('tags')
         recipe.tags.set(tags)
+        enqueue('process_recipe_image', recipe_id=recipe.id)
         return add_ingredient(ingredients, recipe)
 
     @transaction.atomic
     def update(self, instance, validated_data):
         instance.tags.clear()
-        instance.ingredients.clear()
-        validated_data.pop('ingredients')
-        ingredients = self.initial_data.pop('ingredients')
+        ingredients = validated_data.pop('ingredients')
         tags = self.initial_data.pop('tags')
         instance.tags.set(tags)
         add_ingredient(ingredients, instance)
+        if 'image' in validated_data:
+            instance.thumbnail = instance.image_webp = ''
         super().update(instance, validated_data)
         instance.save()
+        if 'image' in validated_data:
+            enqueue('process_recipe_image', recipe_id=instance.id)
         return instance
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return Favorite.objects.filter(
-            user=request.user, recipe=obj
-        ).exists()
+        return is_favorited(self, obj)
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return ShoppingCart.objects.filter(
-            user=request.user, recipe=obj
-        ).exists()
+        return is_in_shopping_cart(self, obj)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], 'tags', 'ingredients_recipes__ingredient'
+        )
         context = {'request': self.context.get('request')}
         return GetRecipeSerializer(instance, context=context).data
 
@@ -252,7 +273,9 @@ class GetRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения полной информации о рецепте."""
     tags = TagSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
-    ingredients = IngredientRecipeSerializer(read_only=True, many=True)
+    ingredients = IngredientRecipeSerializer(
+        source='ingredients_recipes', read_only=True, many=True
+    )
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
 
@@ -260,16 +283,31 @@ class GetRecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'thumbnail', 'image_webp',
+                  'text', 'cooking_time')
 
     def get_is_favorited(self, object):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return object.favorites.filter(user=user).exists()
+        return is_favorited(self, object)
 
     def get_is_in_shopping_cart(self, object):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return object.carts.filter(user=user).exists()
+        return is_in_shopping_cart(self, object)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Статус фоновой задачи."""
+
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        fields = ('id', 'name', 'status', 'result', 'error',
+                  'created', 'finished')
+        model = Job
+
+    def get_result(self, obj):
+        if obj.status != Job.DONE or not obj.result:
+            return None
+        url = default_storage.url(obj.result)
+        request = self.context.get('request')
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.models import Subscribe
+
+from .cache import (INGREDIENTS_VERSION, SHOPPING_CART_VERSION, TAGS_VERSION,
+                    bump_version)
+from .counters import bulk_counted, update_counters
+from .exports import invalidate_shopping_carts
+from .feed import invalidate_feeds
+from .models import (Favorite, Ingredient, Recipe, RecipeScore, ShoppingCart,
+                     Tag)
+from .search import delete_from_search_index, update_search_index
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscribe)
+def counted_created(sender, instance, created, raw=False, **kwargs):
+    """Новая строка увеличивает счетчики рецепта или пользователя."""
+    if created and not raw:
+        update_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscribe)
+def counted_deleted(sender, instance, **kwargs):
+    """Удаленная строка уменьшает счетчики рецепта или пользователя."""
+    if not bulk_counted.get():
+        update_counters(instance, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, raw=False, **kwargs):
+    """Новый рецепт попадает в сортировки с нулевой оценкой до пересчета."""
+    if created and not raw:
+        RecipeScore.objects.create(recipe=instance)
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    """Рецепт добавлен в список покупок или удален из него."""
+    if bulk_counted.get():
+        return
+    transaction.on_commit(
+        lambda: invalidate_shopping_carts([instance.user_id])
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, created, **kwargs):
+    """Изменен рецепт (и его состав), который может быть в списках покупок.
+
+    Состав пишется bulk_create без сигналов, но рецепт при правке
+    всегда сохраняется, и кэш списков сбрасывается после коммита.
+    """
+    if created:
+        return
+    user_ids = list(
+        ShoppingCart.objects.filter(
+            recipe=instance
+        ).values_list('user_id', flat=True)
+    )
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_shopping_carts(user_ids))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_published(sender, instance, created=True, raw=False, **kwargs):
+    """Рецепт появился или исчез в лентах подписчиков автора."""
+    if not created or raw:
+        return
+    user_ids = list(
+        Subscribe.objects.filter(
+            following_id=instance.author_id
+        ).values_list('user_id', flat=True)
+    )
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_feeds(user_ids))
+
+
+@receiver(post_save, sender=Subscribe)
+@receiver(post_delete, sender=Subscribe)
+def subscription_changed(sender, instance, **kwargs):
+    """Изменились подписки, а значит и состав ленты пользователя."""
+    transaction.on_commit(lambda: invalidate_feeds([instance.user_id]))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, raw=False, **kwargs):
+    """Поисковый индекс пересчитывается после коммита, когда записан
+    и состав рецепта."""
+    if not raw:
+        transaction.on_commit(lambda: update_search_index([instance.pk]))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    delete_from_search_index([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, raw=False, **kwargs):
+    """Название ингредиента входит в поисковый индекс его рецептов."""
+    if created or raw:
+        return
+    recipe_ids = list(
+        Recipe.objects.filter(
+            ingredients=instance
+        ).values_list('pk', flat=True)
+    )
+    if recipe_ids:
+        transaction.on_commit(lambda: update_search_index(recipe_ids))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Изменен каталог ингредиентов: названия есть в списках покупок,
+    в индексе автодополнения и в кэше ответов справочника."""
+    transaction.on_commit(lambda: bump_version(SHOPPING_CART_VERSION))
+    transaction.on_commit(lambda: bump_version(INGREDIENTS_VERSION))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Изменен справочник тегов."""
+    transaction.on_commit(lambda: bump_version(TAGS_VERSION))
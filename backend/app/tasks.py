@@ -0,0 +1,49 @@
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from users.models import User
+
+from .exports import EXPORTERS, shopping_cart_ingredients
+from .images import (bound_image, build_image_variants,
+                     delete_image_variants)
+from .jobs import job
+from .models import Recipe
+
+
+@job
+def process_recipe_image(recipe_id):
+    """Уменьшение загруженной картинки и создание ее вариантов."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return ''
+    original = recipe.image.name
+    with recipe.image.open('rb') as source:
+        bounded = bound_image(source, original.rsplit('/', 1)[-1])
+        if bounded is not source:
+            recipe.image.save(bounded.name, bounded, save=False)
+    updated = Recipe.objects.filter(pk=recipe_id, image=original).update(
+        image=recipe.image.name, **build_image_variants(recipe.image)
+    )
+    if not updated:
+        # Картинку рецепта уже заменили: созданные варианты не нужны.
+        delete_image_variants(recipe.image)
+    if recipe.image.name != original:
+        recipe.image.storage.delete(
+            original if updated else recipe.image.name
+        )
+    return recipe.image.name if updated else ''
+
+
+@job
+def export_shopping_cart(user_id, export_format):
+    """Выгрузка списка покупок в файл хранилища."""
+    user = User.objects.get(pk=user_id)
+    with tempfile.TemporaryFile() as file:
+        for chunk in EXPORTERS[export_format](shopping_cart_ingredients(user)):
+            file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        file.seek(0)
+        return default_storage.save(
+            f'exports/shopping_cart_{user_id}.{export_format}', File(file)
+        )
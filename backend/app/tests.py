@@ -1,3 +1,915 @@
-from django.test import TestCase
+import base64
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.authentication import token_users
+from users.models import Subscribe, User
+
+from . import jobs
+from .counters import reconcile_counters
+from .feed import feed_cache_key
+from .images import bound_image, decode_base64_image
+from .models import (Favorite, Ingredient, IngredientRecipe, Job, Recipe,
+                     ShoppingCart, Tag)
+from .tasks import process_recipe_image
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass',
+            first_name='Reader', last_name='Reader'
+        )
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass',
+            first_name='Author', last_name='Author'
+        )
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag-{number}')
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(5)
+        ]
+        for number in range(25):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}',
+                image='recipes/test.png', text='Текст',
+                cooking_time=number + 1
+            )
+            recipe.tags.set(tags)
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in ingredients
+            )
+            if number % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if number % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscribe.objects.create(user=cls.user, following=author)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertListQueries(self, client, expected):
+        for limit in (6, 20):
+            token_users.clear()
+            with self.subTest(limit=limit), self.assertNumQueries(expected):
+                response = client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous(self):
+        self.assertListQueries(APIClient(), 5)
+
+    def test_authenticated(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertListQueries(client, 9)
+        results = client.get('/api/recipes/?limit=20').data['results']
+        self.assertTrue(all(
+            recipe['author']['is_subscribed'] for recipe in results
+        ))
+        self.assertEqual(
+            sum(recipe['is_favorited'] for recipe in results), 10
+        )
+
+
+class KeysetPaginationTest(TestCase):
+    """Курсорный обход списка рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='keyset', email='keyset@example.com', password='pass',
+            first_name='Keyset', last_name='Keyset'
+        )
+        breakfast = Tag.objects.create(name='Завтрак', slug='breakfast')
+        for number in range(15):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}',
+                image='recipes/test.png', text='Текст', cooking_time=1
+            )
+            if number % 2:
+                recipe.tags.add(breakfast)
+        # Две группы с одинаковой датой: порядок внутри решает id.
+        recipes = Recipe.objects.order_by('id')
+        same = timezone.now().replace(microsecond=0)
+        Recipe.objects.filter(pk__in=recipes.values('pk')[:10]).update(
+            pub_date=same
+        )
+        Recipe.objects.filter(pk__in=recipes.values('pk')[10:]).update(
+            pub_date=same - timedelta(days=1)
+        )
+
+    def walk(self, url):
+        client, ids, links = APIClient(), [], []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+            links.append(url)
+        return ids, links[:-1]
+
+    def expected(self, **filters):
+        return list(Recipe.objects.filter(**filters).order_by(
+            '-pub_date', '-id'
+        ).values_list('pk', flat=True))
+
+    def test_walk_across_ties(self):
+        ids, links = self.walk('/api/recipes/?cursor=&limit=4')
+        self.assertEqual(ids, self.expected())
+        self.assertEqual(len(links), 3)
+
+    def test_next_keeps_filters(self):
+        ids, links = self.walk('/api/recipes/?cursor=&limit=2&tags=breakfast')
+        self.assertEqual(ids, self.expected(tags__slug='breakfast'))
+        self.assertEqual(len(ids), 7)
+        for link in links:
+            query = parse_qs(urlparse(link).query)
+            self.assertEqual(query['tags'], ['breakfast'])
+            self.assertEqual(query['limit'], ['2'])
+
+    def test_garbled_cursor(self):
+        client = APIClient()
+        for cursor in ('garbage', 'WyJ4Il0=', 'bm90IGpzb24='):
+            with self.subTest(cursor=cursor):
+                response = client.get(f'/api/recipes/?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+
+
+class ExplainQueriesTest(TestCase):
+    """Основные запросы эндпоинтов не читают таблицы целиком."""
+
+    def test_no_full_scans(self):
+        call_command('explain_queries', stdout=StringIO())
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_search_vector_index(self):
+        """Индекс из миграции есть, и поиск рецептов его использует."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT indexname FROM pg_indexes WHERE tablename = %s',
+                [Recipe._meta.db_table]
+            )
+            indexes = {row[0] for row in cursor.fetchall()}
+        self.assertIn('recipe_search_vector_idx', indexes)
+        output = StringIO()
+        call_command('explain_queries', verbosity=2, stdout=output)
+        self.assertIn('recipe_search_vector_idx', output.getvalue())
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, METRICS_TOKEN='secret')
+class MetricsViewTest(TestCase):
+    """/metrics отдается только с токеном, Server-Timing — в ответах."""
+
+    def test_token_required(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.client.get('/api/tags/')
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'foodgram_app_seconds_total', response.content)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_staff_without_token(self):
+        user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='pass'
+        )
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        User.objects.filter(pk=user.pk).update(is_staff=True)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_server_timing(self):
+        response = self.client.get('/api/tags/')
+        self.assertRegex(
+            response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", '
+            r'app;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+
+
+def png_base64(size=(8, 6)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class Base64ImageTest(TestCase):
+    """Картинка рецепта в data URI."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='pass',
+            first_name='Cook', last_name='Cook'
+        )
+        cls.tag = Tag.objects.create(name='Тег', slug='tag')
+        cls.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+
+    def post_recipe(self, image):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post('/api/recipes/', {
+            'ingredients': [{'id': self.ingredient.id, 'amount': 1}],
+            'tags': [self.tag.id], 'image': image, 'name': 'Рецепт',
+            'text': 'Текст', 'cooking_time': 1,
+        }, format='json')
+
+    def test_wrapped_payload(self):
+        payload = png_base64((300, 200))
+        wrapped = '\n'.join(
+            payload[start:start + 76] for start in range(0, len(payload), 76)
+        )
+        self.assertIn('\n', wrapped)
+        file = decode_base64_image(f'data:image/png;base64,{wrapped}\r\n')
+        self.assertEqual(Image.open(file).size, (300, 200))
+
+    def test_malformed_payload(self):
+        response = self.post_recipe('data:image/png;base64,iVBOR*w0K!!')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_not_an_image(self):
+        payload = base64.b64encode(b'<html>not an image</html>').decode()
+        response = self.post_recipe(f'data:image/png;base64,{payload}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class ShoppingCartExportTest(TestCase):
+    """Выгрузка списка покупок в txt/csv/pdf."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass',
+            first_name='Buyer', last_name='Buyer'
+        )
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        milk = Ingredient.objects.create(name='Молоко', measurement_unit='мл')
+        for amount in (5, 10):
+            recipe = Recipe.objects.create(
+                author=cls.user, name=f'Рецепт {amount}',
+                image='recipes/test.png', text='Текст', cooking_time=1
+            )
+            IngredientRecipe.objects.create(
+                recipe=recipe, ingredient=salt, amount=amount
+            )
+            IngredientRecipe.objects.create(
+                recipe=recipe, ingredient=milk, amount=amount * 10
+            )
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, query='', **headers):
+        return self.client.get(
+            f'/api/recipes/download_shopping_cart/{query}', **headers
+        )
+
+    def test_txt(self):
+        response = self.download('?format=txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; charset=utf-8'
+        )
+        self.assertEqual(
+            response.getvalue().decode(),
+            'Молоко (мл) - 150\nСоль (г) - 15\n'
+        )
+
+    def test_csv_by_accept(self):
+        response = self.download(HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('shopping_cart.csv', response['Content-Disposition'])
+        self.assertEqual(response.getvalue().decode().splitlines(), [
+            'Ингредиент,Единица измерения,Количество',
+            'Молоко,мл,150',
+            'Соль,г,15',
+        ])
+
+    def test_pdf(self):
+        response = self.download('?format=pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        content = response.getvalue()
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertTrue(content.rstrip().endswith(b'%%EOF'))
+
+    def test_unsupported_accept(self):
+        response = self.download(HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 406)
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.download('?format=txt').status_code, 401)
+
+
+class CountersTest(TestCase):
+    """Счетчики избранного, списков покупок, рецептов и подписчиков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='fan', email='fan@example.com', password='pass',
+            first_name='Fan', last_name='Fan'
+        )
+        cls.author = User.objects.create_user(
+            username='chef', email='chef@example.com', password='pass',
+            first_name='Chef', last_name='Chef'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}',
+                image='recipes/test.png', text='Текст', cooking_time=1
+            )
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counters(self):
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        author = User.objects.get(pk=self.author.pk)
+        return {
+            'favorites': recipe.favorites_count,
+            'carts': recipe.carts_count,
+            'recipes': author.recipes_count,
+            'followers': author.followers_count,
+        }
+
+    def test_recipes_count(self):
+        self.assertEqual(self.counters()['recipes'], 2)
+        self.recipes[1].delete()
+        self.assertEqual(self.counters()['recipes'], 1)
+
+    def test_add_and_remove(self):
+        recipe_id, author_id = self.recipes[0].pk, self.author.pk
+        urls = {
+            'favorites': f'/api/recipes/{recipe_id}/favorite/',
+            'carts': f'/api/recipes/{recipe_id}/shopping_cart/',
+            'followers': f'/api/users/{author_id}/subscribe/',
+        }
+        expected = self.counters()
+        for counter, url in urls.items():
+            with self.subTest(counter=counter):
+                self.assertEqual(self.client.post(url).status_code, 201)
+                expected[counter] = 1
+                self.assertEqual(self.counters(), expected)
+                self.assertEqual(self.client.delete(url).status_code, 204)
+                self.assertEqual(self.client.delete(url).status_code, 400)
+                expected[counter] = 0
+                self.assertEqual(self.counters(), expected)
+
+    def test_reconcile_counters(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        Subscribe.objects.create(user=self.user, following=self.author)
+        Recipe.objects.update(favorites_count=7, carts_count=3)
+        User.objects.update(recipes_count=0, followers_count=5)
+        self.assertEqual(reconcile_counters(dry_run=True), {
+            'app.Recipe.favorites_count': 2,
+            'app.Recipe.carts_count': 2,
+            'users.User.recipes_count': 1,
+            'users.User.followers_count': 2,
+        })
+        self.assertEqual(self.counters()['favorites'], 7)
+        reconcile_counters()
+        self.assertEqual(self.counters(), {
+            'favorites': 1, 'carts': 0, 'recipes': 2, 'followers': 1,
+        })
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipes[1].pk).favorites_count, 0
+        )
+        self.assertEqual(set(reconcile_counters(dry_run=True).values()), {0})
+
+
+class BulkFavoriteCartTest(TestCase):
+    """Пакетное добавление и удаление избранного и списка покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='bulk', email='bulk@example.com', password='pass',
+            first_name='Bulk', last_name='Bulk'
+        )
+        author = User.objects.create_user(
+            username='writer', email='writer@example.com', password='pass',
+            first_name='Writer', last_name='Writer'
+        )
+        cls.recipe_ids = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}',
+                image='recipes/test.png', text='Текст', cooking_time=1
+            ).pk
+            for number in range(40)
+        ]
+        cls.missing = max(cls.recipe_ids) + 1
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk(self, method, recipe_ids, url='/api/recipes/favorite/'):
+        response = getattr(self.client, method)(
+            url, {'recipes': recipe_ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return {
+            result['id']: result['status']
+            for result in response.data['results']
+        }
+
+    def counts(self, field):
+        return dict(Recipe.objects.filter(
+            pk__in=self.recipe_ids[:3]
+        ).values_list('pk', field))
+
+    def test_add_mixed(self):
+        first, second, third = self.recipe_ids[:3]
+        Favorite.objects.create(user=self.user, recipe_id=first)
+        statuses = self.bulk('post', [first, second, self.missing, third])
+        self.assertEqual(statuses, {
+            first: 'exists', second: 'created',
+            self.missing: 'not_found', third: 'created',
+        })
+        self.assertEqual(
+            self.counts('favorites_count'), {first: 1, second: 1, third: 1}
+        )
+        self.assertEqual(
+            Favorite.objects.filter(user=self.user).count(), 3
+        )
+
+    def test_delete_mixed(self):
+        first, second, third = self.recipe_ids[:3]
+        self.bulk('post', [first, second])
+        statuses = self.bulk('delete', [first, third, self.missing])
+        self.assertEqual(statuses, {
+            first: 'deleted', third: 'not_found', self.missing: 'not_found',
+        })
+        self.assertEqual(
+            self.counts('favorites_count'), {first: 0, second: 1, third: 0}
+        )
+
+    def test_delete_skips_row_signals(self):
+        url = '/api/recipes/shopping_cart/'
+        first, second = self.recipe_ids[:2]
+        ShoppingCart.objects.create(
+            user=User.objects.get(username='writer'), recipe_id=first
+        )
+        self.bulk('post', [first, second], url=url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.bulk('delete', [first, second], url=url)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.counts('carts_count')[first], 1)
+        self.assertEqual(
+            set(reconcile_counters(dry_run=True).values()), {0}
+        )
+
+    def test_queries_do_not_grow(self):
+        for method in ('post', 'delete'):
+            queries = []
+            for size in (2, 40):
+                with CaptureQueriesContext(connection) as captured:
+                    self.bulk(method, self.recipe_ids[:size])
+                queries.append(len(captured))
+            with self.subTest(method=method):
+                self.assertEqual(queries[0], queries[1])
+
+
+class FeedCacheTest(TestCase):
+    """Закэшированное начало ленты сбрасывается при публикации рецепта
+    автором из подписок и при изменении подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username='follower', email='follower@example.com',
+            password='pass', first_name='Follower', last_name='Follower'
+        )
+        cls.followed = User.objects.create_user(
+            username='followed', email='followed@example.com',
+            password='pass', first_name='Followed', last_name='Followed'
+        )
+        cls.other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass',
+            first_name='Other', last_name='Other'
+        )
+        Subscribe.objects.create(user=cls.reader, following=cls.followed)
+        cls.old = cls.publish(cls.followed, 'Старый')
+        cls.unrelated = cls.publish(cls.other, 'Чужой')
+
+    @staticmethod
+    def publish(author, name):
+        return Recipe.objects.create(
+            author=author, name=name, image='recipes/test.png',
+            text='Текст', cooking_time=1
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def feed(self):
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_first_page_is_cached(self):
+        self.assertEqual(self.feed(), [self.old.pk])
+        Recipe.objects.bulk_create([Recipe(
+            author=self.followed, name='Без сигналов',
+            image='recipes/test.png', text='Текст', cooking_time=1
+        )])
+        self.assertEqual(self.feed(), [self.old.pk])
+
+    def test_followed_author_posts(self):
+        self.assertEqual(self.feed(), [self.old.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publish(self.other, 'Еще чужой')
+        self.assertEqual(self.feed(), [self.old.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            new = self.publish(self.followed, 'Новый')
+        self.assertEqual(self.feed(), [new.pk, self.old.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            new.delete()
+        self.assertEqual(self.feed(), [self.old.pk])
+
+    def test_follow_and_unfollow(self):
+        self.assertEqual(self.feed(), [self.old.pk])
+        url = f'/api/users/{self.other.pk}/subscribe/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.feed(), [self.unrelated.pk, self.old.pk])
+        url = f'/api/users/{self.followed.pk}/subscribe/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.feed(), [self.unrelated.pk])
+
+
+class CatalogueETagTest(TestCase):
+    """ETag справочников: 304 на If-None-Match и смена после правки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name='Обед', slug='lunch')
+        cls.ingredient = Ingredient.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assertETagChanges(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_tag_saved(self):
+        def rename():
+            self.tag.name = 'Ужин'
+            self.tag.save()
+        response = self.assertETagChanges('/api/tags/', rename)
+        self.assertEqual(response.data[0]['name'], 'Ужин')
+
+    def test_ingredient_saved(self):
+        def add():
+            Ingredient.objects.create(name='Соль', measurement_unit='г')
+        response = self.assertETagChanges('/api/ingredients/', add)
+        self.assertEqual(len(response.data), 2)
+
+    def test_detail_etag(self):
+        url = f'/api/tags/{self.tag.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(etag, self.client.get('/api/tags/')['ETag'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"x", {etag}')
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(
+    JOBS_BACKEND='sync', JOBS_STALE_SECONDS=60, JOBS_MAX_ATTEMPTS=2
+)
+class JobsTest(TestCase):
+    """Выполнение, захват и восстановление фоновых задач."""
+
+    def setUp(self):
+        patcher = mock.patch.dict(jobs.registry, {
+            'echo': lambda value: value,
+            'fail': mock.Mock(side_effect=ValueError('boom')),
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enqueue(self, name, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance = jobs.enqueue(name, **kwargs)
+        instance.refresh_from_db()
+        return instance
+
+    def stale_job(self, status, attempts=1):
+        instance = Job.objects.create(name='echo', kwargs='{"value": "x"}')
+        long_ago = timezone.now() - timedelta(minutes=5)
+        Job.objects.filter(pk=instance.pk).update(
+            status=status, attempts=attempts, created=long_ago,
+            started=long_ago if status == Job.RUNNING else None
+        )
+        return instance.pk
+
+    def status(self, pk):
+        return Job.objects.values_list('status', 'attempts').get(pk=pk)
+
+    def test_sync_backend_runs_after_commit(self):
+        instance = self.enqueue('echo', value='ok')
+        self.assertEqual(instance.status, Job.DONE)
+        self.assertEqual(instance.result, 'ok')
+        self.assertEqual(instance.attempts, 1)
+        self.assertIsNotNone(instance.started)
+        self.assertIsNotNone(instance.finished)
+
+    def test_failed_job(self):
+        with self.assertLogs('app.jobs', 'ERROR'):
+            instance = self.enqueue('fail')
+        self.assertEqual(instance.status, Job.FAILED)
+        self.assertEqual(instance.error, 'boom')
+
+    def test_claimed_once(self):
+        pk = self.stale_job(Job.PENDING, attempts=0)
+        jobs.run_job(pk)
+        jobs.run_job(pk)
+        self.assertEqual(self.status(pk), (Job.DONE, 1))
+        running = self.stale_job(Job.RUNNING)
+        jobs.run_job(running)
+        self.assertEqual(self.status(running), (Job.RUNNING, 1))
+
+    def test_sweep(self):
+        lost = self.stale_job(Job.RUNNING)
+        exhausted = self.stale_job(Job.RUNNING, attempts=2)
+        orphaned = self.stale_job(Job.PENDING, attempts=0)
+        fresh = Job.objects.create(name='echo', kwargs='{"value": "x"}')
+        busy = Job.objects.create(
+            name='echo', status=Job.RUNNING, started=timezone.now()
+        )
+        self.assertEqual(jobs.sweep_jobs(), [lost, orphaned])
+        self.assertEqual(self.status(lost), (Job.PENDING, 1))
+        self.assertEqual(self.status(exhausted), (Job.FAILED, 2))
+        self.assertEqual(
+            Job.objects.get(pk=exhausted).error, 'Worker lost'
+        )
+        self.assertEqual(self.status(fresh.pk), (Job.PENDING, 0))
+        self.assertEqual(self.status(busy.pk), (Job.RUNNING, 0))
+        jobs.run_job(lost)
+        self.assertEqual(self.status(lost), (Job.DONE, 2))
+
+    @override_settings(JOBS_BACKEND='db')
+    def test_run_jobs_command(self):
+        lost = self.stale_job(Job.RUNNING)
+        queued = self.enqueue('echo', value='later')
+        self.assertEqual(queued.status, Job.PENDING)
+        call_command('run_jobs', '--once')
+        self.assertEqual(self.status(lost), (Job.DONE, 2))
+        self.assertEqual(self.status(queued.pk), (Job.DONE, 1))
+
+
+class ProcessRecipeImageTest(TestCase):
+    """Обработка картинки рецепта и уборка файлов."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        patcher = override_settings(MEDIA_ROOT=media, RECIPE_IMAGE_MAX_SIDE=50)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        author = User.objects.create_user(
+            username='painter', email='painter@example.com', password='pass',
+            first_name='Painter', last_name='Painter'
+        )
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Текст', cooking_time=1
+        )
+        self.recipe.image.save(
+            'big.png', ContentFile(base64.b64decode(png_base64((120, 80))))
+        )
+        self.storage = self.recipe.image.storage
+
+    def files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), settings.MEDIA_ROOT)
+            for root, _, names in os.walk(settings.MEDIA_ROOT)
+            for name in names
+        )
+
+    def test_resized_and_original_deleted(self):
+        original = self.recipe.image.name
+        name = process_recipe_image(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, name)
+        self.assertFalse(self.storage.exists(original))
+        with self.storage.open(name) as file:
+            self.assertEqual(Image.open(file).size, (50, 33))
+        self.assertTrue(self.storage.exists(self.recipe.thumbnail.name))
+        self.assertTrue(self.storage.exists(self.recipe.image_webp.name))
+
+    def test_lost_race_leaves_no_files(self):
+        replaced = 'recipes/replaced.png'
+
+        def replace_meanwhile(file, name):
+            Recipe.objects.filter(pk=self.recipe.pk).update(image=replaced)
+            return bound_image(file, name)
+
+        original = self.recipe.image.name
+        with mock.patch('app.tasks.bound_image', replace_meanwhile):
+            self.assertEqual(process_recipe_image(self.recipe.pk), '')
+        self.assertEqual(self.files(), [original])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, replaced)
+        self.assertFalse(self.recipe.thumbnail)
+
+
+REPLICA = 'replica_test'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'реплика — копия файла SQLite')
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Чтение с реплики и привязка к основной БД после записи.
+
+    Реплика — отдельный файл SQLite, в который копируется основная БД:
+    после копирования реплика отстает от записей в основную.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Псевдоним добавляется после запуска тестов: тестовая БД для него
+        # не создается, схему и данные дает replicate().
+        cls.replica_dir = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.replica_dir, 'replica.sqlite3')
+        connections.databases[REPLICA] = dict(
+            connections.databases[DEFAULT_DB_ALIAS],
+            NAME=cls.replica_path, TEST={'NAME': cls.replica_path}
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.replica_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.writer = self.create_user('writer')
+        self.reader = self.create_user('reader')
+        self.recipe = Recipe.objects.create(
+            author=self.reader, name='Рецепт', image='recipes/test.png',
+            text='Текст', cooking_time=1
+        )
+        self.replicate()
+
+    def create_user(self, username):
+        user = User.objects.create_user(
+            username=username, email=f'{username}@example.com',
+            password='pass', first_name=username, last_name=username
+        )
+        Token.objects.create(user=user)
+        return user
+
+    def replicate(self):
+        """Копия основной БД в файл реплики."""
+        connections[REPLICA].close()
+        connection.ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {user.auth_token.key}')
+        return client
+
+    def served_by(self, client, url='/api/recipes/'):
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return REPLICA if queries else DEFAULT_DB_ALIAS
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.served_by(APIClient()), REPLICA)
+        self.assertEqual(self.served_by(self.client_for(self.reader)), REPLICA)
+
+    def test_writer_pinned_by_cookie(self):
+        client = self.client_for(self.writer)
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.assertEqual(client.post(url).status_code, 201)
+        self.assertIn('replica_pinned', client.cookies)
+        cache.clear()
+        self.assertEqual(self.served_by(client), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.served_by(self.client_for(self.reader)), REPLICA)
+
+    def test_writer_pinned_by_shared_cache(self):
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.assertEqual(
+            self.client_for(self.writer).post(url).status_code, 201
+        )
+        # Другой процесс или устройство с тем же токеном, без cookie.
+        client = self.client_for(self.writer)
+        self.assertEqual(self.served_by(client), DEFAULT_DB_ALIAS)
+        response = client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertTrue(response.data['is_favorited'])
+        self.assertEqual(self.served_by(self.client_for(self.reader)), REPLICA)
+        cache.clear()
+        self.assertEqual(self.served_by(client), REPLICA)
+
+    def test_catalogue_filled_from_primary(self):
+        tag = Tag.objects.create(name='Ужин', slug='dinner')
+        response = APIClient().get('/api/tags/')
+        self.assertEqual(
+            [item['id'] for item in response.data], [tag.pk]
+        )
+
+    def test_feed_head_filled_from_primary(self):
+        Subscribe.objects.create(user=self.writer, following=self.reader)
+        self.replicate()
+        new = Recipe.objects.create(
+            author=self.reader, name='Новый', image='recipes/test.png',
+            text='Текст', cooking_time=1
+        )
+        client = self.client_for(self.writer)
+        self.assertEqual(
+            self.served_by(client, '/api/recipes/feed/'), REPLICA
+        )
+        self.assertEqual(
+            cache.get(feed_cache_key(self.writer.pk)),
+            [new.pk, self.recipe.pk]
+        )
+
+    def test_shopping_cart_filled_from_primary(self):
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        IngredientRecipe.objects.create(
+            recipe=self.recipe, ingredient=salt, amount=5
+        )
+        self.replicate()
+        ShoppingCart.objects.create(user=self.writer, recipe=self.recipe)
+        response = self.client_for(self.writer).get(
+            '/api/recipes/download_shopping_cart/?format=txt'
+        )
+        self.assertEqual(response.getvalue().decode(), 'Соль (г) - 5\n')
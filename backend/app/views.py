@@ -1,10 +1,7 @@
-import io
-
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import IntegrityError, router, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.pdfgen import canvas
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
@@ -14,15 +11,23 @@ from rest_framework.response import Response
 from rest_framework.test import APIRequestFactory
 from users.models import User
 
+from .cache import INGREDIENTS_VERSION, TAGS_VERSION
+from .counters import counted_in_bulk, update_counters_bulk
+from .exports import (EXPORTERS, invalidate_shopping_carts,
+                      shopping_cart_ingredients)
 from .filters import IngredientFilter, RecipeFilter
-from .mixins import ListRetrieveViewSet
-from .models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                     ShoppingCart, Tag)
+from .mixins import (CachedCatalogueMixin, KeysetPaginationMixin,
+                     ListRetrieveViewSet)
+from .jobs import enqueue
+from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from .permissions import *
-from .serializers import (FavoriteSerializer, IngredientSerializer,
-                          RecipeCreateUpdateSerializer,
+from .renderers import CsvRenderer, PdfRenderer, TxtRenderer
+from .scores import RECIPE_SORTS
+from .serializers import (FavoriteSerializer, GetRecipeSerializer,
+                          IngredientSerializer, JobSerializer,
+                          RecipeCreateUpdateSerializer, RecipeIdsSerializer,
                           ShoppingCartSerializer, TagSerializer)
-from .paginations import LimitPagination
+from .paginations import FeedPagination, KeysetPagination, LimitPagination
 
 
 def add_to(model, user, pk, serializer_class):
@@ -36,26 +41,108 @@ def add_to(model, user, pk, serializer_class):
 def delete_from(model, user, pk):
     """Удаление экземпляра"""
 
-    if model.objects.filter(user=user, recipe__id=pk).exists():
-        model.objects.filter(
-            user=user, recipe__id=pk
-        ).delete()
+    deleted, _ = model.objects.filter(user=user, recipe__id=pk).delete()
+    if deleted:
         return Response(status=status.HTTP_204_NO_CONTENT)
     return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagViewSet(ListRetrieveViewSet):
+def bulk_add_to(model, user, recipe_ids):
+    """Пакетное создание экземпляров.
+
+    Рецепты и уже добавленные записи проверяются двумя запросами,
+    новые записи создаются одним bulk_create; сигналы при этом не
+    отправляются, поэтому счетчики и кэш списка покупок обновляются здесь.
+    """
+    found = set(
+        Recipe.objects.filter(pk__in=recipe_ids).values_list('pk', flat=True)
+    )
+    existing = set(
+        model.objects.filter(
+            user=user, recipe_id__in=found
+        ).values_list('recipe_id', flat=True)
+    )
+    created = [pk for pk in recipe_ids if pk in found - existing]
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                model(user=user, recipe_id=pk) for pk in created
+            )
+    except IntegrityError:
+        # Параллельный запрос успел добавить часть записей: в счетчики
+        # попадают только строки, вставленные здесь.
+        created = [pk for pk in created if insert_one(model, user, pk)]
+    update_counters_bulk(model, created, 1)
+    if model is ShoppingCart and created:
+        transaction.on_commit(lambda: invalidate_shopping_carts([user.id]))
+    statuses = {pk: 'exists' for pk in found}
+    statuses.update({pk: 'created' for pk in created})
+    return [
+        {'id': pk, 'status': statuses.get(pk, 'not_found')}
+        for pk in recipe_ids
+    ]
+
+
+def insert_one(model, user, pk):
+    """Вставка одной записи без сигналов; False, если она уже есть."""
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create([model(user=user, recipe_id=pk)])
+    except IntegrityError:
+        return False
+    return True
+
+
+def bulk_delete_from(model, user, recipe_ids):
+    """Пакетное удаление экземпляров.
+
+    Удаляемые строки блокируются до DELETE, поэтому счетчики уменьшаются
+    ровно на удаленные записи; сигналы по каждой строке их не трогают.
+    """
+    queryset = model.objects.using(router.db_for_write(model)).filter(
+        user=user, recipe_id__in=recipe_ids
+    )
+    deleted = set(
+        queryset.select_for_update().values_list('recipe_id', flat=True)
+    )
+    with counted_in_bulk():
+        queryset.delete()
+    update_counters_bulk(model, list(deleted), -1)
+    if model is ShoppingCart and deleted:
+        transaction.on_commit(lambda: invalidate_shopping_carts([user.id]))
+    return [
+        {'id': pk, 'status': 'deleted' if pk in deleted else 'not_found'}
+        for pk in recipe_ids
+    ]
+
+
+def bulk_response(request, model):
+    """Разбор списка рецептов и пакетное добавление/удаление"""
+    serializer = RecipeIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+    with transaction.atomic():
+        if request.method == 'POST':
+            results = bulk_add_to(model, request.user, recipe_ids)
+        else:
+            results = bulk_delete_from(model, request.user, recipe_ids)
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class TagViewSet(CachedCatalogueMixin, ListRetrieveViewSet):
     """Класс вьюсета тегов"""
 
+    catalogue_version = TAGS_VERSION
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(ListRetrieveViewSet):
+class IngredientViewSet(CachedCatalogueMixin, ListRetrieveViewSet):
     """Класс вьюсета ингредиетов"""
 
+    catalogue_version = INGREDIENTS_VERSION
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
@@ -64,16 +151,39 @@ class IngredientViewSet(ListRetrieveViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """Класс вьюсета рецептов"""
 
+    use_replica = True
     queryset = Recipe.objects.all()
     serializer_class = RecipeCreateUpdateSerializer
     pagination_class = LimitPagination
+    keyset_pagination_class = KeysetPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
 
+    def get_queryset(self):
+        """Кверисет рецептов с предзагрузкой тегов, ингредиентов и авторов.
+
+        Признаки избранного/списка покупок/подписки сериализаторы берут
+        из app.membership, поэтому страница любого размера обходится
+        постоянным числом запросов.
+        """
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'ingredients_recipes__ingredient'
+        )
+
+    @property
+    def keyset_ordering(self):
+        """Ключ курсора для sort=popular|trending."""
+        return RECIPE_SORTS.get(self.request.query_params.get('sort'))
+
+    def get_serializer_class(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return GetRecipeSerializer
+        return super().get_serializer_class()
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -94,26 +204,71 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return delete_from(Favorite, request.user, pk)
 
     @action(
+        methods=['post', 'delete'],
         detail=False,
-        permission_classes=(IsAuthor,),
-        pagination_class=None,
+        url_path='favorite',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def favorite_bulk(self, request):
+        """Добавление/удаление списка рецептов в избранном"""
+        return bulk_response(request, Favorite)
+
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=FeedPagination,
+        keyset_pagination_class=None,
     )
-    def download_shopping_cart(self, request) :
-        """Скачивания списка покупок пользователя"""
-        ingredients = list(IngredientRecipe.objects.filter(
-            recipe__carts__user=request.user
-        ).values_list(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(Sum('amount')))
-        file_data = []
-
-        for ingredient in ingredients :
-            file_data.append(f'{ingredient[0]} ({ingredient[1]}) - {ingredient[2]}\n')
-        response = HttpResponse(file_data, content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename="shopping_car.txt"'
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь"""
+        queryset = self.get_queryset().filter(
+            author__following__user=request.user
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=None,
+        renderer_classes=(TxtRenderer, CsvRenderer, PdfRenderer),
+    )
+    def download_shopping_cart(self, request):
+        """Скачивание списка покупок пользователя в формате txt/csv/pdf"""
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            EXPORTERS[renderer.format](shopping_cart_ingredients(request.user)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{renderer.format}"'
+        )
         return response
 
+    @action(
+        methods=['post'],
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def export_shopping_cart(self, request):
+        """Фоновая выгрузка списка покупок, статус — в /api/jobs/<id>/"""
+        export_format = request.data.get('format', PdfRenderer.format)
+        if export_format not in EXPORTERS:
+            return Response(
+                {'format': [f'Доступные форматы: {", ".join(EXPORTERS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        job = enqueue(
+            'export_shopping_cart', user=request.user,
+            user_id=request.user.id, export_format=export_format
+        )
+        serializer = JobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
     @action(
         methods=['post', 'delete'],
         detail=True,
@@ -127,3 +282,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer_class = ShoppingCartSerializer
             return add_to(ShoppingCart, request.user, pk, serializer_class)
         return delete_from(ShoppingCart, request.user, pk)
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='shopping_cart',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def shopping_cart_bulk(self, request):
+        """Добавление/удаление списка рецептов в списке покупок"""
+        return bulk_response(request, ShoppingCart)
+
+
+class JobViewSet(ListRetrieveViewSet):
+    """Класс вьюсета фоновых задач пользователя"""
+
+    serializer_class = JobSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = LimitPagination
+
+    def get_queryset(self):
+        return self.request.user.jobs.all()
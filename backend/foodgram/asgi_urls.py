@@ -0,0 +1,10 @@
+"""URLconf приложения ASGI: асинхронные read-маршруты перед общими."""
+from app.async_views import async_urlpatterns
+from app.urls import router
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include(async_urlpatterns(router))),
+] + sync_urlpatterns
@@ -0,0 +1,35 @@
+"""Проверка постоянных соединений с БД.
+
+В Django 3.2 нет CONN_HEALTH_CHECKS: соединение, закрытое сервером
+между запросами (рестарт, idle-таймаут, pgbouncer), обнаруживается
+только ошибкой первого запроса. Как и в Django 4.1, соединение
+проверяется один раз за HTTP-запрос — при первом обращении к нему;
+нерабочее закрывается, и Django сразу открывает новое. Соединения,
+которые запрос не использует, не проверяются.
+"""
+from django.db import connections
+
+
+class HealthCheckMixin:
+    """Примесь к DatabaseWrapper: проверка перед первым курсором."""
+
+    health_check_pending = False
+
+    def _cursor(self, *args, **kwargs):
+        if self.health_check_pending:
+            self.health_check_pending = False
+            if (
+                self.connection is not None
+                and not self.in_atomic_block
+                and not self.is_usable()
+            ):
+                self.close()
+        return super()._cursor(*args, **kwargs)
+
+
+def schedule_health_checks(**kwargs):
+    """Обработчик request_started: отметить открытые соединения для
+    проверки, без обращения к серверу."""
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.health_check_pending = True
@@ -0,0 +1,7 @@
+"""PostgreSQL с проверкой соединения при первом обращении в запросе."""
+from django.db.backends.postgresql import base
+from foodgram.connections import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,220 @@
+"""Метрики запросов: число SQL-запросов, время БД, вьюхи и ответа.
+
+Включаются настройкой REQUEST_METRICS_ENABLED. Значения отдаются в
+заголовке Server-Timing каждого ответа и суммарно по вьюхам на /metrics
+в текстовом формате Prometheus (счетчики ведутся в каждом процессе).
+Замеры запроса лежат в contextvar, поэтому под ASGI учитываются и
+SQL-запросы, выполненные в потоках sync_to_async.
+"""
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+METRICS = (
+    ('requests_total', 'Requests handled.'),
+    ('queries_total', 'SQL queries executed.'),
+    ('db_seconds_total', 'Time spent in SQL.'),
+    ('app_seconds_total', 'Time spent in view code outside SQL.'),
+    ('render_seconds_total', 'Time spent rendering responses.'),
+    ('request_seconds_total', 'Total request time.'),
+)
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self, method):
+        self.method = method
+        self.view = 'unresolved'
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.app_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+        self._view_started = None
+        self._view_db_time = 0.0
+        self._render_started = None
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def view_started(self, view):
+        self.view = view
+        self._view_started = time.perf_counter()
+        self._view_db_time = self.db_time
+
+    def view_finished(self):
+        if self._view_started is None:
+            return
+        self._render_started = time.perf_counter()
+        self.app_time = (
+            self._render_started - self._view_started
+            - (self.db_time - self._view_db_time)
+        )
+
+    def finished(self):
+        now = time.perf_counter()
+        self.total_time = now - self.started
+        if self._render_started is not None:
+            self.render_time = now - self._render_started
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'app;dur={self.app_time * 1000:.1f}',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ))
+
+
+class MetricsRegistry:
+    """Накопленные метрики по вьюхам текущего процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(lambda: dict.fromkeys(
+            (name for name, _ in METRICS), 0
+        ))
+
+    def record(self, metrics):
+        with self._lock:
+            values = self._values[metrics.view, metrics.method]
+            values['requests_total'] += 1
+            values['queries_total'] += metrics.queries
+            values['db_seconds_total'] += metrics.db_time
+            values['app_seconds_total'] += metrics.app_time
+            values['render_seconds_total'] += metrics.render_time
+            values['request_seconds_total'] += metrics.total_time
+
+    def render(self):
+        with self._lock:
+            snapshot = {
+                labels: dict(values) for labels, values in self._values.items()
+            }
+        lines = []
+        for name, description in METRICS:
+            lines.append(f'# HELP foodgram_{name} {description}')
+            lines.append(f'# TYPE foodgram_{name} counter')
+            for (view, method), values in sorted(snapshot.items()):
+                lines.append(
+                    f'foodgram_{name}{{view="{view}",method="{method}"}} '
+                    f'{values[name]:g}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute(execute, sql, params, many, context)
+
+
+def install_query_counter():
+    """Подключение count_query к соединениям текущего потока.
+
+    Обертка остается на соединении и пишет в замеры того запроса, в
+    контексте которого выполняется SQL; вне запроса она ничего не делает.
+    """
+    for connection in connections.all():
+        if count_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(count_query)
+
+
+class RequestMetricsMiddleware:
+    """Сбор метрик запроса через connection.execute_wrapper.
+
+    Поддерживает и WSGI, и ASGI, как ReplicaRoutingMiddleware. Под ASGI
+    SQL выполняется в других потоках: в потоке синхронных вьюх счетчик
+    подключает process_view, в пуле асинхронных вьюх — db_sync_to_async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        install_query_counter()
+        metrics, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(metrics, response)
+
+    async def acall(self, request):
+        metrics, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(metrics, response)
+
+    def start(self, request):
+        metrics = RequestMetrics(request.method)
+        request.metrics = metrics
+        return metrics, current_metrics.set(metrics)
+
+    def finish(self, metrics, response):
+        metrics.finished()
+        response['Server-Timing'] = metrics.server_timing()
+        registry.record(metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        install_query_counter()
+        request.metrics.view_started(request.resolver_match.view_name)
+
+    def process_template_response(self, request, response):
+        request.metrics.view_finished()
+        return response
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus.
+
+    Доступны с заголовком Authorization: Bearer <METRICS_TOKEN>, а без
+    заданного METRICS_TOKEN — только сотрудникам (сессия админки).
+    """
+    if not settings.REQUEST_METRICS_ENABLED:
+        raise Http404
+    if settings.METRICS_TOKEN:
+        allowed = constant_time_compare(
+            request.headers.get('Authorization', ''),
+            f'Bearer {settings.METRICS_TOKEN}'
+        )
+    else:
+        allowed = request.user.is_active and request.user.is_staff
+    if not allowed:
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
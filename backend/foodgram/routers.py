@@ -0,0 +1,124 @@
+"""Чтение с реплик БД.
+
+Реплики перечисляются в DB_REPLICAS (см. settings). Безопасные запросы
+к вьюсетам с атрибутом use_replica = True читают с одной случайной
+реплики; остальные запросы и все записи идут в default. После
+POST/PUT/PATCH/DELETE клиент REPLICA_STICKY_SECONDS читает с основной
+БД, чтобы видеть собственные изменения, пока реплика догоняет. Отметка
+о записи хранится в общем кэше (по токену или сессии) и в cookie с тем
+же сроком жизни, поэтому ее видит любой процесс и любой воркер.
+"""
+import asyncio
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import Resolver404, resolve
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PIN_COOKIE = 'replica_pinned'
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+class ReplicaRouter:
+    """Чтение с выбранной для запроса реплики, запись и миграции — default."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def client_key(request):
+    """Идентификатор клиента для привязки к основной БД после записи."""
+    credentials = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    digest = hashlib.sha256(credentials.encode()).hexdigest()
+    return f'replica_pinned:{digest}'
+
+
+class ReplicaRoutingMiddleware:
+    """Выбор БД для чтения на время запроса.
+
+    Поддерживает и WSGI, и ASGI: под ASGI синхронный middleware Django
+    выполнял бы все запросы в одном общем потоке.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        token = read_alias.set(self.choose_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        self.pin_client(request, response)
+        return response
+
+    async def acall(self, request):
+        token = read_alias.set(self.choose_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        self.pin_client(request, response)
+        return response
+
+    def choose_alias(self, request):
+        """Реплика для безопасного запроса к вьюсету с use_replica."""
+        if request.method not in SAFE_METHODS:
+            return None
+        try:
+            match = resolve(
+                request.path_info, getattr(request, 'urlconf', None)
+            )
+        except Resolver404:
+            return None
+        view_class = getattr(match.func, 'cls', None)
+        if not getattr(view_class, 'use_replica', False):
+            return None
+        if PIN_COOKIE in request.COOKIES:
+            return None
+        key = client_key(request)
+        if key is not None and cache.get(key):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def pin_client(self, request, response):
+        if request.method in SAFE_METHODS:
+            return
+        response.set_cookie(
+            PIN_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+            httponly=True, samesite='Lax'
+        )
+        key = client_key(request)
+        if key is not None:
+            cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
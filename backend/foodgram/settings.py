@@ -14,6 +14,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -50,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.RequestMetricsMiddleware',
+    'foodgram.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -102,6 +106,66 @@ else:
         }
     }
 
+# Постоянные соединения: секунды жизни соединения (0 — закрывать после
+# каждого запроса, пусто — без ограничения). С DB_CONN_HEALTH_CHECKS
+# соединение PostgreSQL проверяется при первом обращении в каждом запросе
+# (см. foodgram.connections).
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60')
+DATABASES['default']['CONN_MAX_AGE'] = (
+    int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None
+)
+DB_CONN_HEALTH_CHECKS = (
+    os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+)
+if (
+    DB_CONN_HEALTH_CHECKS
+    and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+):
+    DATABASES['default']['ENGINE'] = 'foodgram.db.postgresql'
+
+# Реплики только для чтения: DB_REPLICAS — список через запятую хостов
+# (для SQLite — путей к файлам). Схему на реплики приносит репликация,
+# миграции выполняются только в default.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(','))
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = replica.strip()
+    else:
+        DATABASES[alias]['HOST'] = replica.strip()
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+
+# Кэш должен быть общим для всех процессов: версии справочников, сброс
+# списков покупок, ленты и токенов выполняет процесс, обработавший запись.
+# Кэш в памяти процесса допустим только при DEBUG (тесты, разработка).
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            PROCESS_LOCAL_CACHES[0] if DEBUG
+            else 'django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', 'foodgram' if DEBUG else 'memcached:11211'
+        ),
+    }
+}
+if not DEBUG and CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND must be shared between processes when DEBUG is off'
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -155,7 +219,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -182,3 +246,63 @@ DJOSER = {
         "current_user": "users.serializers.CustomUserSerializer",
     },
 }
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+SHOPPING_CART_CACHE_TIMEOUT = int(
+    os.getenv('SHOPPING_CART_CACHE_TIMEOUT', 60 * 60)
+)
+
+INGREDIENT_AUTOCOMPLETE_LIMIT = int(
+    os.getenv('INGREDIENT_AUTOCOMPLETE_LIMIT', 50)
+)
+INGREDIENT_INDEX_CHECK_SECONDS = int(
+    os.getenv('INGREDIENT_INDEX_CHECK_SECONDS', 60)
+)
+
+CATALOGUE_CACHE_TIMEOUT = int(os.getenv('CATALOGUE_CACHE_TIMEOUT', 60 * 60))
+
+RECIPE_IMAGE_MAX_BYTES = int(os.getenv('RECIPE_IMAGE_MAX_BYTES', 10 * 2 ** 20))
+RECIPE_IMAGE_MAX_PIXELS = int(os.getenv('RECIPE_IMAGE_MAX_PIXELS', 50_000_000))
+RECIPE_IMAGE_MAX_SIDE = int(os.getenv('RECIPE_IMAGE_MAX_SIDE', 1920))
+RECIPE_IMAGE_QUALITY = int(os.getenv('RECIPE_IMAGE_QUALITY', 85))
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': '400x400',
+    'image_webp': f'{RECIPE_IMAGE_MAX_SIDE}x{RECIPE_IMAGE_MAX_SIDE}',
+}
+
+JOBS_BACKEND = os.getenv('JOBS_BACKEND', 'thread')
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 2))
+# Задача в RUNNING дольше JOBS_STALE_SECONDS считается брошенной
+# (процесс упал или перезапущен) и возвращается в очередь, не более
+# JOBS_MAX_ATTEMPTS запусков; проверка — раз в JOBS_SWEEP_SECONDS.
+JOBS_STALE_SECONDS = int(os.getenv('JOBS_STALE_SECONDS', 10 * 60))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 3))
+JOBS_SWEEP_SECONDS = int(os.getenv('JOBS_SWEEP_SECONDS', 60))
+
+REQUEST_METRICS_ENABLED = (
+    os.getenv('REQUEST_METRICS_ENABLED', 'false').lower() == 'true'
+)
+# Токен для /metrics (Authorization: Bearer ...); без него — staff.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+RECIPE_SCORE_CART_WEIGHT = float(os.getenv('RECIPE_SCORE_CART_WEIGHT', 0.5))
+RECIPE_SCORE_HALF_LIFE_HOURS = float(
+    os.getenv('RECIPE_SCORE_HALF_LIFE_HOURS', 48)
+)
+RECIPE_SCORE_TRENDING_DAYS = int(os.getenv('RECIPE_SCORE_TRENDING_DAYS', 14))
+
+FEED_CACHE_TIMEOUT = int(os.getenv('FEED_CACHE_TIMEOUT', 10 * 60))
+
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', 'russian')
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10_000))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 30))
+AUTH_TOKEN_SHARED_CACHE = os.getenv('AUTH_TOKEN_SHARED_CACHE', '')
+AUTH_TOKEN_SHARED_CACHE_TTL = int(
+    os.getenv('AUTH_TOKEN_SHARED_CACHE_TTL', 5 * 60)
+)
+
+BULK_RECIPES_LIMIT = int(os.getenv('BULK_RECIPES_LIMIT', 100))
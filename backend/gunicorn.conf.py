@@ -0,0 +1,41 @@
+"""Настройки gunicorn, значения берутся из окружения.
+
+gthread (по умолчанию) — процессы с пулом потоков; у каждого потока свое
+постоянное соединение с БД, всего до GUNICORN_WORKERS * GUNICORN_THREADS
+соединений, это число должно укладываться в max_connections PostgreSQL.
+Для gevent нужен установленный gevent; если установлен psycogreen,
+драйвер psycopg2 переводится в неблокирующий режим.
+Процессов по умолчанию один: кэш версий, токенов и лент должен быть общим
+для всех процессов, поэтому GUNICORN_WORKERS > 1 задается только вместе с
+общим CACHE_BACKEND (см. infra/docker-compose.yml).
+ASGI: GUNICORN_APP=foodgram.asgi:application и
+GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker; запросы к БД
+асинхронных вьюх выполняются в пуле из ASGI_THREADS потоков.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning('psycogreen is not installed, psycopg2 blocks')
+        else:
+            patch_psycopg()
+
+
+def post_worker_init(worker):
+    from app.jobs import start_sweeper
+
+    start_sweeper()
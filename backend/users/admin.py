@@ -10,6 +10,8 @@ class AdminUser(admin.ModelAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
     )
 
     search_fields = (
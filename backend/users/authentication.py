@@ -0,0 +1,123 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+class TTLCache:
+    """Ограниченный по размеру LRU-кэш с временем жизни записей."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (time.monotonic() + self.ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+token_users = TTLCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL
+)
+
+
+def shared_cache():
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    """Ключ общего кэша: сам токен в хранилище кэша не попадает."""
+    return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(keys):
+    """Сброс токенов из кэша этого процесса и общего кэша.
+
+    В других процессах запись живет не дольше AUTH_TOKEN_CACHE_TTL.
+    """
+    keys = list(keys)
+    for key in keys:
+        token_users.delete(key)
+    cache = shared_cache()
+    if cache is not None and keys:
+        cache.delete_many([shared_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену без запроса к БД для известных токенов.
+
+    Пользователь ищется в LRU-кэше процесса, затем в общем кэше
+    (AUTH_TOKEN_SHARED_CACHE), и только потом в таблице токенов.
+    Записи сбрасываются при выходе (удалении токена) и при изменении
+    пользователя, в том числе деактивации.
+    """
+
+    def lookup_token(self, key):
+        """Поиск токена в основной БД: только что выданный токен
+        может еще не дойти до реплики."""
+        model = self.get_model()
+        try:
+            token = model.objects.db_manager(
+                router.db_for_write(model)
+            ).select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+    def authenticate_credentials(self, key):
+        user = token_users.get(key)
+        cache = shared_cache()
+        if user is None and cache is not None:
+            user = cache.get(shared_key(key))
+            if user is not None:
+                token_users.set(key, user)
+        if user is None:
+            user, token = self.lookup_token(key)
+            token_users.set(key, copy.copy(user))
+            if cache is not None:
+                cache.set(
+                    shared_key(key), user,
+                    settings.AUTH_TOKEN_SHARED_CACHE_TTL
+                )
+            return user, token
+        if not user.is_active:
+            invalidate_tokens([key])
+            return self.lookup_token(key)
+        user = copy.copy(user)
+        return user, self.get_model()(key=key, user=user)
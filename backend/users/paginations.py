@@ -1,3 +1,4 @@
+from app.paginations import KeysetPagination
 from rest_framework.pagination import PageNumberPagination
 
 
@@ -5,3 +6,7 @@ class LimitsPagination(PageNumberPagination):
     page_size = 3
     page_size_query_param = 'recipes_limit'
     max_page_size = 20
+
+
+class SubscriptionsKeysetPagination(KeysetPagination):
+    ordering = ('-id',)
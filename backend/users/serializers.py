@@ -1,3 +1,4 @@
+from app.membership import is_subscribed
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
@@ -73,18 +74,14 @@ class CustomUserSerializer(UserSerializer):
         return user
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return Subscribe.objects.filter(
-            user=request.user, following=obj
-        ).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return is_subscribed(self, obj)
 
 
 class FollowSerializer(CustomUserSerializer):
     """Сериализатор для добавления/удаления подписки, просмотра подписок."""
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField(read_only=True)
 
     class Meta(CustomUserSerializer.Meta):
         fields = CustomUserSerializer.Meta.fields + ('recipes', 'recipes_count')
@@ -94,11 +91,11 @@ class FollowSerializer(CustomUserSerializer):
 
         request = self.context.get('request')
         context = {'request': request}
-        recipes_limit = request.query_params.get('recipes_limit')
-        queryset = obj.recipe.all()
-        if recipes_limit:
-            queryset = queryset[:int(recipes_limit)]
+        if hasattr(obj, 'latest_recipes'):
+            queryset = obj.latest_recipes
+        else:
+            recipes_limit = request.query_params.get('recipes_limit')
+            queryset = obj.recipe.all()
+            if recipes_limit:
+                queryset = queryset[:int(recipes_limit)]
         return RecipeSerializer(queryset, context=context, many=True).data
-
-    def get_recipes_count(self, obj):
-        return obj.recipe.count()
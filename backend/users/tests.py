@@ -1,3 +1,71 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .authentication import shared_key, token_users
+from .models import User
+
+
+@override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+class CachedTokenAuthenticationTest(TestCase):
+    """Закэшированный токен перестает приниматься после выхода и
+    деактивации пользователя."""
+
+    def setUp(self):
+        cache.clear()
+        token_users.clear()
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass',
+            first_name='Owner', last_name='Owner'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def assertCached(self, cached):
+        key = self.token.key
+        self.assertEqual(token_users.get(key) is not None, cached)
+        self.assertEqual(cache.get(shared_key(key)) is not None, cached)
+
+    def me(self):
+        return self.client.get('/api/users/me/')
+
+    def test_cached_after_first_request(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.assertCached(True)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.me().status_code, 200)
+        self.assertFalse(any(
+            Token._meta.db_table in query['sql'] for query in queries
+        ))
+
+    def test_logout(self):
+        self.assertEqual(self.me().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertCached(False)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deactivated_user(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertCached(False)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deactivated_in_shared_cache_only(self):
+        """Другой процесс деактивировал пользователя: запись в общем
+        кэше устарела, но неактивный пользователь не проходит."""
+        self.assertEqual(self.me().status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        token_users.clear()
+        stale = cache.get(shared_key(self.token.key))
+        stale.is_active = False
+        cache.set(shared_key(self.token.key), stale)
+        self.assertEqual(self.me().status_code, 401)
+        self.assertCached(False)
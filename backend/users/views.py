@@ -1,9 +1,13 @@
+from app.mixins import KeysetPaginationMixin
+from app.models import Recipe
 from app.permissions import *
+from django.db.models import (BooleanField, OuterRef, Prefetch, Subquery,
+                              Value)
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from .paginations import LimitsPagination
+from .paginations import LimitsPagination, SubscriptionsKeysetPagination
 from rest_framework.response import Response
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
@@ -12,9 +16,28 @@ from .models import Subscribe, User
 from .serializers import CustomUserSerializer, FollowSerializer, SubscribeSerializer
 
 
-class CustomUserViewSet(UserViewSet):
+def latest_recipes(recipes_limit):
+    """Рецепты авторов, не больше recipes_limit последних у каждого.
+
+    Ограничение накладывается коррелированным подзапросом с LIMIT,
+    поэтому все рецепты страницы подписок выбираются одним запросом.
+    """
+    recipes = Recipe.objects.all()
+    try:
+        recipes_limit = int(recipes_limit)
+    except (TypeError, ValueError):
+        return recipes
+    return recipes.filter(pk__in=Subquery(
+        Recipe.objects.filter(
+            author=OuterRef('author')
+        ).order_by('-pub_date', '-id').values('pk')[:max(recipes_limit, 0)]
+    ))
+
+
+class CustomUserViewSet(KeysetPaginationMixin, UserViewSet):
     """Класс вьюсета пользователя"""
 
+    use_replica = True
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
@@ -22,11 +45,18 @@ class CustomUserViewSet(UserViewSet):
 
     @action(detail=False,
             permission_classes=[IsAuthenticated],
-            pagination_class=LimitsPagination
+            pagination_class=LimitsPagination,
+            keyset_pagination_class=SubscriptionsKeysetPagination
             )
     def subscriptions(self, request):
         user = request.user
-        follows = User.objects.filter(following__user=user)
+        follows = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).prefetch_related(Prefetch(
+            'recipe',
+            queryset=latest_recipes(request.query_params.get('recipes_limit')),
+            to_attr='latest_recipes'
+        ))
         page = self.paginate_queryset(follows)
         serializer = FollowSerializer(
             page, many=True,